@@ -0,0 +1,279 @@
+"""Benchmarki bota - lokalnie, bez Discorda i bez sieci
+
+Użycie: python bench.py
+"""
+import gc
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+
+os.environ.setdefault("DRAFT_DB_PATH", ":memory:")
+
+import main
+
+
+def timed(func, repeat: int = 5) -> float:
+    """Najlepszy z kilku pomiarów, w milisekundach"""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best * 1000
+
+
+# ========== TABLICA !lista ========== #
+def legacy_board(draft):
+    """Dawna wersja !lista - wszystko od nowa i kwadratowe dzielenie na części"""
+    chunks = []
+    current_chunk = ["**Wybrani zawodnicy:**"]
+    for user, picks in draft.picked_players.items():
+        if not picks:
+            continue
+        team = draft.user_teams.get(user, "Nieznana")
+        players = ", ".join(f"{p} ({draft.players_database[p]})" for p in sorted(picks))
+        team_colors = "".join(main.TEAM_COLORS.get(team, ['⚫']))
+        line = f"{team_colors} **{user}** ({team}): {players}"
+        if len("\n".join(current_chunk + [line])) > 1900:
+            chunks.append("\n".join(current_chunk))
+            current_chunk = [line]
+        else:
+            current_chunk.append(line)
+    chunks.append("\n".join(current_chunk))
+    return chunks
+
+
+def make_board_draft(users: int, picks_per_user: int):
+    draft = main.DraftState(f"bench:{users}:{picks_per_user}")
+    draft.players_database = {i: f"Zawodnik Testowy {i}" for i in range(users * picks_per_user)}
+    draft.user_teams = {f"gracz{u}": "Ajax" for u in range(users)}
+    draft.picked_players = {
+        f"gracz{u}": list(range(u * picks_per_user, (u + 1) * picks_per_user))
+        for u in range(users)
+    }
+    return draft
+
+
+def bench_board():
+    print("## !lista (ms)")
+    print(f"{'gracze':>7} {'wybory':>7} {'dawniej':>9} {'zimno':>9} {'cache':>9} {'po wyborze':>11}")
+    for users, picks_per_user in ((50, 20), (200, 20), (500, 10), (1000, 5)):
+        draft = make_board_draft(users, picks_per_user)
+        assert [c.split("\n(Część")[0] for c in main.render_board(draft)] == legacy_board(draft)
+
+        legacy = timed(lambda: legacy_board(draft))
+
+        def cold():
+            draft.invalidate_board()
+            main.render_board(draft)
+        cold_ms = timed(cold)
+        warm_ms = timed(lambda: main.render_board(draft))
+
+        def after_pick():
+            draft.invalidate_board("gracz0")
+            main.render_board(draft)
+        pick_ms = timed(after_pick)
+
+        print(f"{users:>7} {users * picks_per_user:>7} {legacy:>9.3f} {cold_ms:>9.3f} {warm_ms:>9.4f} {pick_ms:>11.3f}")
+
+
+# ========== KATALOG I WYBORY ========== #
+def legacy_parse_players(text: str):
+    """Dawny parser - dict z osobnym int i str na każdego zawodnika"""
+    players_dict = {}
+    for line in text.splitlines():
+        if line.strip():
+            parts = line.strip().split(maxsplit=1)
+            if len(parts) == 2:
+                try:
+                    players_dict[int(parts[0])] = parts[1]
+                except ValueError:
+                    continue
+    return players_dict
+
+
+def traced_size(build):
+    """Zbudowany obiekt i bajty, które nadal zajmuje na stercie Pythona"""
+    gc.collect()
+    tracemalloc.start()
+    obj = build()
+    gc.collect()
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return obj, size
+
+
+def rss_mib() -> float:
+    with open("/proc/self/statm") as f:
+        return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2**20
+
+
+def rss_growth(kind: str, size: int) -> float:
+    """Przyrost RSS po zbudowaniu struktury - w osobnym procesie, żeby sterta była świeża"""
+    result = subprocess.run(
+        [sys.executable, __file__, "--rss", kind, str(size)],
+        capture_output=True, text=True, check=True
+    )
+    return float(result.stdout.split()[0])
+
+
+def measure_rss(kind: str, size: int):
+    text = "\n".join(f"{i} Zawodnik Testowy Numer {i}" for i in range(1, size + 1))
+    parse = legacy_parse_players if kind == "dict" else main.parse_players
+    gc.collect()
+    before = rss_mib()
+    players = parse(text)
+    gc.collect()
+    print(rss_mib() - before, len(players))
+
+
+def bench_catalogue():
+    print("## Katalog i wybory")
+    print(
+        f"{'zawodnicy':>10} {'dict MiB':>9} {'katalog MiB':>12} {'mmap MiB':>9} "
+        f"{'set MiB':>8} {'bitmapa MiB':>12} {'dict us':>8} {'katalog us':>11} {'set us':>7} {'bitmapa us':>11}"
+    )
+    rnd = random.Random(1)
+    for size in (10_000, 100_000, 1_000_000):
+        text = "\n".join(f"{i} Zawodnik Testowy Numer {i}" for i in range(1, size + 1))
+        legacy, legacy_size = traced_size(lambda: legacy_parse_players(text))
+        catalogue, catalogue_size = traced_size(lambda: main.parse_players(text))
+        assert dict(catalogue.items()) == legacy
+
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "catalogue.bin")
+            catalogue.save(path)
+            mapped, mapped_size = traced_size(lambda: main.Catalogue.open(path))
+            assert mapped[size] == legacy[size]
+
+            # Typowy !wybieram: kilka numerów, każdy sprawdzony w katalogu i wśród wybranych
+            picked = rnd.sample(range(1, size + 1), size // 10)
+            legacy_picked, set_size = traced_size(lambda: set(picked))
+            bitset, bitset_size = traced_size(lambda: main.PickedSet(picked))
+            queries = [rnd.randint(1, size * 2) for _ in range(10_000)]
+
+            def validate(database, chosen):
+                return lambda: [p in database and p not in chosen for p in queries]
+            assert validate(legacy, legacy_picked)() == validate(mapped, bitset)()
+            per_query = 1000 / len(queries)
+            print(
+                f"{size:>10} {legacy_size / 2**20:>9.2f} {catalogue_size / 2**20:>12.2f} "
+                f"{mapped_size / 2**20:>9.2f} {set_size / 2**20:>8.2f} {bitset_size / 2**20:>12.2f} "
+                f"{timed(validate(legacy, legacy_picked)) * per_query:>8.3f} "
+                f"{timed(validate(catalogue, bitset)) * per_query:>11.3f} "
+                f"{timed(lambda: [p in legacy_picked for p in queries]) * per_query:>7.3f} "
+                f"{timed(lambda: [p in bitset for p in queries]) * per_query:>11.3f}"
+            )
+            del mapped
+
+        print(f"{'':>10} przyrost RSS: dict {rss_growth('dict', size):.1f} MiB, katalog {rss_growth('catalogue', size):.1f} MiB")
+
+
+# ========== WOLNI ZAWODNICY ========== #
+def bench_available():
+    """Strona !wolni: przegląd całego katalogu (naiwnie) vs posortowana lista wybranych"""
+    print("## !wolni - strona 20 wolnych zawodników (ms)")
+    print(f"{'zawodnicy':>10} {'wybrani':>8} {'przegląd':>9} {'indeks':>8} {'ostatnia str.':>14}")
+    rnd = random.Random(1)
+    for size in (10_000, 100_000, 1_000_000):
+        catalogue = main.Catalogue.from_pairs([(i, f"Zawodnik {i}") for i in range(1, size + 1)])
+        picked = rnd.sample(range(1, size + 1), 500)
+        chosen, available = main.PickedSet(picked), main.AvailablePlayers(picked)
+        start = size // 2
+
+        def scan():
+            free = [p for p in catalogue if p not in chosen]
+            return len(free), free[start:start + 20]
+        assert scan() == available.page(catalogue.ids, start, 20)
+        last = size - len(picked) - 20
+        print(
+            f"{size:>10} {len(picked):>8} {timed(scan, repeat=1):>9.1f} "
+            f"{timed(lambda: available.page(catalogue.ids, start, 20)):>8.3f} "
+            f"{timed(lambda: available.page(catalogue.ids, last, 20)):>14.3f}"
+        )
+
+
+# ========== ODŚWIEŻANIE KATALOGU ========== #
+def bench_refresh():
+    """Nowa wersja listy: różnica + aktualizacja indeksu wyszukiwarki vs zbudowanie go od nowa"""
+    print("## Odświeżenie katalogu - 10 i 1% zmian (ms)")
+    print(f"{'zawodnicy':>10} {'zmiany':>7} {'różnica':>9} {'aktualizacja indeksu':>21} {'indeks od nowa':>15}")
+    rnd = random.Random(1)
+    syllables = ["ko", "wal", "ski", "now", "ak", "lew", "an", "dow", "icz", "ma", "rek", "zy", "ch", "ber"]
+
+    def name():
+        return " ".join("".join(rnd.choices(syllables, k=rnd.randint(2, 4))).title() for _ in range(2))
+    for size in (10_000, 100_000, 1_000_000):
+        players = {i: name() for i in range(1, size + 1)}
+        old = main.Catalogue.from_pairs(list(players.items()))
+        index = main.PlayerIndex(old) if size <= 100_000 else None
+        rebuild_ms = None
+        for changes in (10, size // 100):
+            updated = dict(players)
+            for i in rnd.sample(range(1, size + 1), changes):
+                updated[i] = name()
+            new = main.Catalogue.from_pairs(list(updated.items()))
+            diff_ms = timed(lambda: main.catalogue_diff(old, new))
+            diff = main.catalogue_diff(old, new)
+            if index is None:
+                # Indeks 1 mln nazwisk buduje się kilkanaście sekund - pomijamy
+                print(f"{size:>10} {changes:>7} {diff_ms:>9.1f} {'-':>21} {'-':>15}")
+                continue
+
+            def update(forward=True):
+                # Tam i z powrotem - każde powtórzenie zaczyna od tego samego indeksu
+                source, target = (old, new) if forward else (new, old)
+                for player_id in diff.removed + diff.renamed + diff.added:
+                    index.update(player_id, source, target)
+            started = time.perf_counter()
+            update()
+            update_ms = (time.perf_counter() - started) * 1000
+            if rebuild_ms is None:
+                rebuild_ms = timed(lambda: main.PlayerIndex(new), repeat=1)
+            rebuilt = main.PlayerIndex(new)
+            assert (index.names, index.trigrams, index.prefixes, index.filters) == (
+                rebuilt.names, rebuilt.trigrams, rebuilt.prefixes, rebuilt.filters
+            )
+            update(forward=False)
+            print(f"{size:>10} {changes:>7} {diff_ms:>9.1f} {update_ms:>21.1f} {rebuild_ms:>15.1f}")
+
+
+# ========== START BOTA ========== #
+def bench_startup():
+    """Wczytanie katalogu przy starcie: z kopii tekstowej (dawniej) i zmapowanej kopii .bin"""
+    print("## Start - wczytanie katalogu z kopii na dysku (ms)")
+    print(f"{'zawodnicy':>10} {'z tekstu':>9} {'mmap .bin':>10} {'indeks wyszukiwarki':>20}")
+    for size in (10_000, 100_000, 1_000_000):
+        text = "\n".join(f"{i} Zawodnik Testowy Numer {i}" for i in range(1, size + 1))
+        with tempfile.TemporaryDirectory() as tmp:
+            main.PLAYERS_CACHE_PATH = os.path.join(tmp, "players_cache.txt")
+            main.PLAYERS_CACHE_META_PATH = main.PLAYERS_CACHE_PATH + ".meta.json"
+            main.PLAYERS_CACHE_CATALOGUE_PATH = main.PLAYERS_CACHE_PATH + ".bin"
+            catalogue = main.parse_players(text)
+            main.write_players_cache(text, catalogue, {"etag": "x", "version": main.catalogue_version_of(text)})
+
+            mapped_ms = timed(main.read_players_cache, repeat=3)
+            os.remove(main.PLAYERS_CACHE_CATALOGUE_PATH)
+            text_ms = timed(main.read_players_cache, repeat=3)
+            # Indeks 1 mln nazwisk buduje się kilkanaście sekund - pomijamy
+            index = f"{timed(lambda: main.PlayerIndex(catalogue), repeat=1):.1f}" if size <= 100_000 else "-"
+        print(f"{size:>10} {text_ms:>9.1f} {mapped_ms:>10.3f} {index:>20}")
+
+
+if __name__ == "__main__":
+    if sys.argv[1:2] == ["--rss"]:
+        measure_rss(sys.argv[2], int(sys.argv[3]))
+        sys.exit()
+    bench_board()
+    print()
+    bench_catalogue()
+    print()
+    bench_available()
+    print()
+    bench_refresh()
+    print()
+    bench_startup()
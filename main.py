@@ -1,57 +1,669 @@
 import discord
+from discord import app_commands
 from discord.ext import commands
 import os
+import socket
+import json
+import time
+import logging
+import functools
+import hashlib
+import html
+import threading
+import sqlite3
+import heapq
+import mmap
+import struct
 import asyncio
-from datetime import datetime, timedelta
-import requests
+import aiohttp
+import itertools
+import operator
+import contextlib
+import signal
+import unicodedata
+import mimetypes
+from urllib.parse import parse_qs, urlparse
+from array import array
+from bisect import bisect_left, insort
+from collections import OrderedDict, defaultdict
+from collections.abc import Mapping
+from datetime import datetime, timedelta, timezone
 import random
-from typing import Dict, List, Set
+from typing import Callable, Dict, List, NamedTuple, Optional, Set, Tuple
 
 # ========== KONFIGURACJA BOTA ========== #
+PROCESS_STARTED_AT = time.perf_counter()
+COMMAND_PREFIX = "!"
+# Bez message_content Discord przysyła treść tylko wiadomości ze wzmianką bota - komendy tekstowe
+# działają wtedy jako "@Bot wybieram 1, 2", a najczęstsze są też dostępne jako komendy slash
+MESSAGE_CONTENT_INTENT = os.getenv("MESSAGE_CONTENT_INTENT", "1") == "1"
 intents = discord.Intents.default()
-intents.message_content = True
-intents.members = True
+intents.message_content = MESSAGE_CONTENT_INTENT
+intents.members = False  # uczestnicy są wiązani po ID - pełna lista członków nie jest potrzebna
 
-bot = commands.Bot(
-    command_prefix='!',
+# Kilka procesów bota: każdy z własnym SHARD_ID (Discord dzieli serwery między shardy)
+# albo wszystkie bez shardingu - wtedy wiadomość obsługuje worker, który pierwszy ją zajmie w bazie
+SHARD_COUNT = int(os.getenv("SHARD_COUNT", "0"))
+shard_options = {"shard_id": int(os.getenv("SHARD_ID", "0")), "shard_count": SHARD_COUNT} if SHARD_COUNT else {}
+
+class DraftCommandTree(app_commands.CommandTree):
+    async def interaction_check(self, interaction: discord.Interaction) -> bool:
+        # Jak w on_message: bez shardingu interakcję dostaje każdy worker - obsługuje ten, kto ją zajmie
+        return await store_retry(store.claim_message, interaction.id)
+
+class DraftBot(commands.Bot):
+    async def close(self):
+        if not self.is_closed():
+            # Kolejki kanałów wysyłamy, póki jest jeszcze połączenie - inaczej ostatnie wybory giną
+            try:
+                await asyncio.wait_for(flush_outboxes(), SHUTDOWN_FLUSH_TIMEOUT)
+            except asyncio.TimeoutError:
+                print("Nie wszystkie wiadomości zdążyły wyjść przed zamknięciem bota")
+            # Oddajemy dzierżawy od razu, żeby inny worker nie czekał na ich wygaśnięcie
+            try:
+                store.release_all(WORKER_ID)
+            except sqlite3.Error as e:
+                print(f"Nie udało się oddać dzierżaw przy zamykaniu: {e}")
+        await super().close()
+
+bot = DraftBot(
+    command_prefix=commands.when_mentioned_or(COMMAND_PREFIX),
     intents=intents,
     help_command=None,
-    case_insensitive=True
+    case_insensitive=True,
+    tree_cls=DraftCommandTree,
+    **shard_options
 )
 
+# ========== KATALOG ZAWODNIKÓW ========== #
+class Catalogue(Mapping):
+    """Niezmienny katalog zawodników: posortowane ID, jeden blob UTF-8 z nazwiskami i tablica przesunięć
+
+    Zamiast dwóch obiektów Pythona na zawodnika (int i str w dict) trzy płaskie tablice,
+    a nazwisko jest dekodowane dopiero przy odczycie. Ten sam układ trafia na dysk,
+    więc zapisaną kopię można zmapować (mmap) bez parsowania.
+    """
+    MAGIC = b"DKT1"
+    HEADER = struct.Struct("=4sIQ")  # znacznik, liczba zawodników, długość bloba
+    SEPARATOR = "\x1f"  # oddziela nazwisko od dodatkowych kolumn (pozycja, klub) w blobie
+
+    def __init__(self, ids, offsets, blob, has_details: Optional[bool] = None):
+        self.ids = ids
+        self.offsets = offsets
+        self.blob = blob
+        self.has_details = self.SEPARATOR.encode() in blob if has_details is None else has_details
+        # Przy ciągłych numerach (np. 1..N) pozycja to zwykłe odejmowanie, bez wyszukiwania binarnego
+        self.first = ids[0] if len(ids) else 0
+        self.dense = len(ids) > 0 and ids[-1] - ids[0] + 1 == len(ids)
+
+    @classmethod
+    def from_pairs(cls, pairs: List[Tuple[int, str]]) -> "Catalogue":
+        # Sortowanie jest stabilne - przy powtórzonym ID wygrywa ostatnia linia, jak w dawnym dict
+        pairs.sort(key=lambda pair: pair[0])
+        ids, offsets, lengths, blob = array("q"), array("Q", [0]), array("Q"), bytearray()
+        for i, (player_id, name) in enumerate(pairs):
+            if i + 1 < len(pairs) and pairs[i + 1][0] == player_id:
+                continue
+            ids.append(player_id)
+            encoded = name.encode("utf-8")
+            blob += encoded
+            offsets.append(len(blob))
+            lengths.append(len(encoded))
+        catalogue = cls(ids, offsets, bytes(blob))
+        catalogue.lengths = lengths  # przy okazji budowy - bez osobnego przejścia przy porównywaniu wersji
+        return catalogue
+
+    def position(self, player_id: int) -> int:
+        """Indeks zawodnika w tablicach albo -1"""
+        if self.dense:
+            pos = player_id - self.first
+            return pos if 0 <= pos < len(self.ids) else -1
+        pos = bisect_left(self.ids, player_id)
+        return pos if pos < len(self.ids) and self.ids[pos] == player_id else -1
+
+    def record(self, player_id: int) -> str:
+        pos = self.position(player_id) if isinstance(player_id, int) else -1
+        if pos < 0:
+            raise KeyError(player_id)
+        return str(self.blob[self.offsets[pos]:self.offsets[pos + 1]], "utf-8")
+
+    def __getitem__(self, player_id: int) -> str:
+        record = self.record(player_id)
+        return record.partition(self.SEPARATOR)[0] if self.has_details else record
+
+    def details(self, player_id: int) -> List[str]:
+        """Dodatkowe kolumny z listy zawodników (np. pozycja, klub) - pusta lista, gdy ich nie ma"""
+        return self.record(player_id).split(self.SEPARATOR)[1:] if self.has_details else []
+
+    @functools.cached_property
+    def lengths(self) -> array:
+        """Długości wpisów w blobie - do porównywania całych bloków z inną wersją katalogu
+
+        Katalog z from_pairs dostaje je od razu, zmapowany z dysku liczy je raz, przy pierwszym porównaniu.
+        """
+        return array("Q", map(operator.sub, self.offsets[1:], self.offsets[:-1]))
+
+    def same_block(self, pos: int, other: "Catalogue", other_pos: int, count: int) -> bool:
+        """Czy `count` wpisów od `pos` jest identycznych z wpisami `other` od `other_pos` (porównanie w C)
+
+        Porównujemy bajty - memoryview z mmap porównany z tablicą szedłby po jednym elemencie.
+        """
+        return (
+            bytes(self.lengths[pos:pos + count]) == bytes(other.lengths[other_pos:other_pos + count])
+            and bytes(self.blob[self.offsets[pos]:self.offsets[pos + count]])
+            == bytes(other.blob[other.offsets[other_pos]:other.offsets[other_pos + count]])
+        )
+
+    def same_ids(self, pos: int, other: "Catalogue", other_pos: int, count: int) -> bool:
+        return bytes(self.ids[pos:pos + count]) == bytes(other.ids[other_pos:other_pos + count])
+
+    def __contains__(self, player_id) -> bool:
+        return isinstance(player_id, int) and self.position(player_id) >= 0
+
+    def __iter__(self):
+        return iter(self.ids)
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def save(self, path: str):
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(self.HEADER.pack(self.MAGIC, len(self.ids), len(self.blob)))
+            f.write(self.ids.tobytes())
+            f.write(self.offsets.tobytes())
+            f.write(self.blob)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def open(cls, path: str) -> "Catalogue":
+        """Mapuje zapisany katalog - strony pliku wczytuje system dopiero przy odczycie"""
+        with open(path, "rb") as f:
+            mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, count, blob_size = cls.HEADER.unpack_from(mapped)
+        ids_start = cls.HEADER.size
+        offsets_start = ids_start + 8 * count
+        blob_start = offsets_start + 8 * (count + 1)
+        if magic != cls.MAGIC or len(mapped) != blob_start + blob_size:
+            raise ValueError(f"Uszkodzony plik katalogu: {path}")
+        view = memoryview(mapped)
+        return cls(
+            view[ids_start:offsets_start].cast("q"),
+            view[offsets_start:blob_start].cast("Q"),
+            view[blob_start:],
+            has_details=mapped.find(cls.SEPARATOR.encode(), blob_start) >= 0,
+        )
+
+class CatalogueDiff(NamedTuple):
+    added: List[int]
+    removed: List[int]
+    renamed: List[int]  # ten sam numer, inne nazwisko albo kolumny
+
+    @property
+    def changed(self) -> List[int]:
+        """Numery, których dotychczasowy opis jest już nieaktualny"""
+        return sorted(self.removed + self.renamed)
+
+    def __bool__(self) -> bool:
+        return bool(self.added or self.removed or self.renamed)
+
+DIFF_BLOCK = 1024  # wpisów porównywanych naraz - różniące się bloki są dzielone na pół, aż do jednego wpisu
+
+def catalogue_diff(old: Catalogue, new: Catalogue) -> CatalogueDiff:
+    """Różnica dwóch wersji katalogu - w Pythonie kosztuje tyle, ile zmian, resztę porównuje C
+
+    Obie wersje idą naraz blokami. Blok z tymi samymi numerami i innymi wpisami jest dzielony
+    na pół, aż zostaną same różniące się wpisy; przy rozjechanych numerach wspólny początek
+    bloku wyznacza wyszukiwanie binarne, a Python klasyfikuje tylko pierwszy różny numer.
+    """
+    added, removed, renamed = [], [], []
+
+    def find_renamed(i: int, j: int, count: int):
+        if old.same_block(i, new, j, count):
+            return
+        if count == 1:
+            renamed.append(old.ids[i])
+            return
+        half = count // 2
+        find_renamed(i, j, half)
+        find_renamed(i + half, j + half, count - half)
+
+    i = j = 0
+    while i < len(old.ids) and j < len(new.ids):
+        size = same = min(DIFF_BLOCK, len(old.ids) - i, len(new.ids) - j)
+        if not old.same_ids(i, new, j, size):
+            low, high = 0, size - 1
+            while low < high:
+                mid = (low + high + 1) // 2
+                if old.same_ids(i, new, j, mid):
+                    low = mid
+                else:
+                    high = mid - 1
+            same = low
+        if same:
+            find_renamed(i, j, same)
+            i, j = i + same, j + same
+        if same < size:
+            if old.ids[i] < new.ids[j]:
+                removed.append(old.ids[i])
+                i += 1
+            else:
+                added.append(new.ids[j])
+                j += 1
+    removed.extend(old.ids[i:])
+    added.extend(new.ids[j:])
+    return CatalogueDiff(added, removed, renamed)
+
+class PickedSet:
+    """Wybrane numery jako bitmapa - jeden bit na numer zamiast obiektu int w set
+
+    Numery trafiają tu dopiero po sprawdzeniu w katalogu, więc rozmiar mapy
+    ogranicza największy numer zawodnika (1 mln numerów = 125 KB). Numery spoza
+    0..LIMIT (np. ze starej kopii listy) trafiają do zwykłego zbioru zamiast mapy.
+    """
+
+    LIMIT = 1 << 24  # mapa najwyżej 2 MB na draft
+
+    def __init__(self, numbers=()):
+        self.bits = bytearray()
+        self.sparse: Set[int] = set()
+        self.count = 0
+        self.update(numbers)
+
+    def __contains__(self, number) -> bool:
+        if not isinstance(number, int):
+            return False
+        if not 0 <= number < self.LIMIT:
+            return number in self.sparse
+        if number >> 3 >= len(self.bits):
+            return False
+        return bool(self.bits[number >> 3] & (1 << (number & 7)))
+
+    def add(self, number: int):
+        if not 0 <= number < self.LIMIT:
+            if number not in self.sparse:
+                self.sparse.add(number)
+                self.count += 1
+            return
+        byte = number >> 3
+        if byte >= len(self.bits):
+            self.bits.extend(bytes(max(byte + 1, 2 * len(self.bits)) - len(self.bits)))
+        mask = 1 << (number & 7)
+        if not self.bits[byte] & mask:
+            self.bits[byte] |= mask
+            self.count += 1
+
+    def update(self, numbers):
+        for number in numbers:
+            self.add(number)
+
+    def clear(self):
+        self.bits = bytearray()
+        self.sparse.clear()
+        self.count = 0
+
+    def __len__(self) -> int:
+        return self.count
+
+    def __iter__(self):
+        outside = sorted(self.sparse)
+        yield from (n for n in outside if n < 0)
+        for byte_index, byte in enumerate(self.bits):
+            if byte:
+                for bit in range(8):
+                    if byte & (1 << bit):
+                        yield byte_index * 8 + bit
+        yield from (n for n in outside if n >= 0)
+
+class AvailablePlayers:
+    """Wolni zawodnicy draftu: katalog minus posortowana lista wybranych numerów
+
+    Lista jest uzupełniana przy każdym wyborze, więc strona !wolni kosztuje tyle, ile
+    wybranych zawodników i wyników na stronie - niezależnie od rozmiaru katalogu.
+    """
+
+    def __init__(self, numbers=()):
+        self.taken: List[int] = sorted(numbers)
+
+    def update(self, numbers):
+        for number in numbers:
+            i = bisect_left(self.taken, number)
+            if i == len(self.taken) or self.taken[i] != number:
+                self.taken.insert(i, number)
+
+    def clear(self):
+        self.taken = []
+
+    def page(self, ids, start: int, count: int) -> Tuple[int, List[int]]:
+        """Liczba wolnych wśród posortowanych `ids` (katalog albo filtr) i `count` z nich od `start`-tego"""
+        taken = []
+        for number in self.taken:
+            rank = bisect_left(ids, number)
+            if rank < len(ids) and ids[rank] == number:
+                taken.append(rank)
+
+        # start-ty wolny leży o tyle dalej, ilu wybranych jest przed nim
+        rank, i = start, 0
+        while i < len(taken) and taken[i] <= rank:
+            rank += 1
+            i += 1
+        found = []
+        while len(found) < count and rank < len(ids):
+            if i < len(taken) and taken[i] == rank:
+                i += 1
+            else:
+                found.append(ids[rank])
+            rank += 1
+        return len(ids) - len(taken), found
+
+# ========== KOLEJNOŚĆ WYBORÓW ========== #
+class Turn(NamedTuple):
+    pick_no: int       # numer tury w całym drafcie, od 0
+    round: int
+    player_index: int  # pozycja gracza w kolejności z pierwszej rundy
+    picks: int         # ilu zawodników wybiera w tej turze
+
+def parse_draft_format(text: str) -> List[int]:
+    """Liczba zawodników na turę w kolejnych rundach: '1,1,1,3,3,3,3,3' albo skrótem '1*3,3*5'"""
+    round_picks = []
+    for part in text.split(","):
+        picks, _, repeat = part.strip().partition("*")
+        round_picks += [int(picks)] * int(repeat or 1)
+    if not round_picks or min(round_picks) < 1:
+        raise ValueError(f"Niepoprawny format draftu: {text}")
+    return round_picks
+
+def build_schedule(players_count: int, round_picks: List[int], order: str = "snake") -> List[Turn]:
+    """Cała kolejność draftu liczona raz przy !start - kto i ile wybiera to potem zwykły indeks"""
+    schedule = []
+    for round_no, picks in enumerate(round_picks):
+        positions = range(players_count)
+        if order == "snake" and round_no % 2:
+            positions = reversed(positions)
+        for player_index in positions:
+            schedule.append(Turn(len(schedule), round_no, player_index, picks))
+    return schedule
+
 # ========== STAN DRAFTU ========== #
+def _dt_to_str(value: Optional[datetime]) -> Optional[str]:
+    return value.isoformat() if value else None
+
+def _dt_from_str(value: Optional[str]) -> Optional[datetime]:
+    return datetime.fromisoformat(value) if value else None
+
 class DraftState:
-    def __init__(self):
+    def __init__(self, key: str):
+        self.key = key
+        self.lock = asyncio.Lock()
+        self.seq: int = 0  # ostatnie zdarzenie z dziennika zastosowane w tym procesie
+        self.timer_lease_until: float = 0.0  # do kiedy ten worker na pewno jest właścicielem timerów
+        self.armed_seq: int = 0  # stan, dla którego timery były ostatnio ustawione
         self.players: List[discord.Member] = []
-        self.current_index: int = 0
-        self.current_round: int = 0
-        self.total_rounds: int = 8
-        self.picked_numbers: Set[int] = set()
-        self.user_teams: Dict[str, str] = {
-            "ann0d0m1n1": "Ajax",            # ⚪🔴
-            "FakenSzit": "Real Madryt",      # ⚪🟣
-            "TommyAlex": "Juventus",         # ⚪⚫
-            "pogoda": "Ossasuna",            # 🔴🟣
-            "wenoid": "Galatasaray",         # 🟡🔴
-            "wordlifepl": "Celtic",          # ⚪🟢
-            "mikoprotek": "Inter",           # 🔵⚫
-        }
-        self.picked_players: Dict[str, List[int]] = {name.lower(): [] for name in ["wenoid", "wordlifepl"]}  # INITIALIZED
-        self.players_database: Dict[int, str] = {}
+        self.round_picks: List[int] = DRAFT_ROUND_PICKS
+        self.draft_order: str = DRAFT_ORDER
+        self.schedule: List[Turn] = []
+        self.pick_no: int = 0  # indeks bieżącej tury w schedule
+        self.pick_mode: str = DRAFT_PICK_MODE
+        self.window_picks: Dict[str, List[int]] = {}  # tryb okien - zgłoszenia graczy w bieżącej rundzie
+        self.picked_numbers: PickedSet = PickedSet()
+        self.available = AvailablePlayers()  # to samo co picked_numbers, posortowane - dla !wolni
+        # Stały skład dostaje tylko kanał domowy - na pozostałych gracze dochodzą przez !przypisz
+        home = key.rpartition(":")[2] == str(DEFAULT_TEAMS_CHANNEL_ID)
+        self.user_teams: Dict[str, str] = dict(DEFAULT_USER_TEAMS) if home else {}
+        self.participant_ids: Dict[str, int] = {}
+        self.picked_players: Dict[str, List[int]] = {}
+        self.queues: Dict[str, List[int]] = {}  # !kolejka - lista życzeń gracza, od najważniejszego
+        self.players_database: Mapping[int, str] = players_database
+        self.catalogue_version: Optional[str] = None  # wersja listy zawodników z !start - None to zawsze najnowsza
         self.draft_started: bool = False
         self.team_draft_started: bool = True  # POMIJAMY WYBÓR DRUŻYN
         self.current_team_selector_index: int = 0
         self.pick_deadline: datetime = None
-        self.pick_timer_task = None
-        self.reminder_tasks: List[asyncio.Task] = []
+        self.timers: Dict[str, "Timer"] = {}
         self.bonus_round_started: bool = False
         self.bonus_round_players: Set[str] = set()
         self.bonus_deadline: datetime = None
         self.bonus_end_time: datetime = None
+        self.channel_id: Optional[int] = None
+        self.status_message_id: Optional[int] = None  # przypięta wiadomość ze statusem draftu
+        self.status_text: Optional[str] = None  # ostatnio wysłana treść statusu (w tym procesie)
+        # Wyrenderowana tablica !lista - linie per gracz i gotowe części wiadomości
+        self.board_lines: Dict[str, str] = {}
+        self.board_chunks: Optional[List[str]] = None
+
+    @property
+    def participants(self) -> List[str]:
+        return list(self.user_teams.keys())  # Używa przypisanych graczy
+
+    @property
+    def current_turn(self) -> Optional[Turn]:
+        if not self.draft_started or self.pick_no >= len(self.schedule):
+            return None
+        return self.schedule[self.pick_no]
+
+    @property
+    def on_the_clock(self) -> Optional[discord.Member]:
+        """Gracz, który ma teraz turę"""
+        turn = self.current_turn
+        return self.players[turn.player_index] if turn else None
+
+    def nick_of(self, user_id: int) -> Optional[str]:
+        return next((nick for nick, i in self.participant_ids.items() if i == user_id), None)
+
+    def name_of(self, player) -> str:
+        """Nazwa gracza do wiadomości - gracze odtworzeni z bazy bywają samym discord.Object"""
+        return getattr(player, "display_name", None) or self.nick_of(player.id) or f"<@{player.id}>"
+
+    def queued_picks(self, user: str, count: int) -> List[int]:
+        """Pierwsze `count` wciąż dostępnych numerów ze zgłoszenia w oknie i kolejki gracza (mniej, jeśli brakuje)"""
+        picks = []
+        for p in itertools.chain(self.window_picks.get(user, ()), self.queues.get(user, ())):
+            if p not in self.picked_numbers and p in self.players_database and p not in picks:
+                picks.append(p)
+                if len(picks) == count:
+                    break
+        return picks
+
+    def window_turns(self) -> List[Turn]:
+        """Tury bieżącej rundy, od bieżącej - w trybie okien to kolejność pierwszeństwa"""
+        turn = self.current_turn
+        if turn is None:
+            return []
+        return list(itertools.takewhile(lambda t: t.round == turn.round, self.schedule[turn.pick_no:]))
+
+    @property
+    def is_active(self) -> bool:
+        return self.draft_started or self.bonus_round_started
+
+    @property
+    def has_pending_timers(self) -> bool:
+        return any(not timer.cancelled for timer in self.timers.values())
+
+    @property
+    def owns_timers(self) -> bool:
+        return self.timer_lease_until > time.monotonic()
+
+    def arm(self, name: str, when: datetime, callback, *args):
+        """Ustawia (lub przestawia) nazwany timer draftu - tylko u workera, który dzierżawi timery"""
+        if not take_timer_lease(self):
+            return
+        scheduler.cancel(self.timers.pop(name, None))
+        self.timers[name] = scheduler.schedule(when, callback, *args)
+
+    def cancel_timers(self, prefix: str = ""):
+        for name in [n for n in self.timers if n.startswith(prefix)]:
+            scheduler.cancel(self.timers.pop(name))
 
-draft = DraftState()
+    def to_dict(self) -> dict:
+        """Stan do zapisu w snapshocie (bez tasków i bazy zawodników)"""
+        return {
+            "players": [p.id for p in self.players],
+            "round_picks": self.round_picks,
+            "draft_order": self.draft_order,
+            "pick_no": self.pick_no,
+            "pick_mode": self.pick_mode,
+            "window_picks": self.window_picks,
+            "picked_numbers": sorted(self.picked_numbers),
+            "user_teams": self.user_teams,
+            "participant_ids": self.participant_ids,
+            "picked_players": self.picked_players,
+            "queues": self.queues,
+            "draft_started": self.draft_started,
+            "pick_deadline": _dt_to_str(self.pick_deadline),
+            "bonus_round_started": self.bonus_round_started,
+            "bonus_round_players": sorted(self.bonus_round_players),
+            "bonus_deadline": _dt_to_str(self.bonus_deadline),
+            "bonus_end_time": _dt_to_str(self.bonus_end_time),
+            "channel_id": self.channel_id,
+            "status_message_id": self.status_message_id,
+            "catalogue_version": self.catalogue_version,
+        }
+
+    def load_dict(self, data: dict):
+        # Gracze wracają jako discord.Object - bind_members podmienia ich na członków serwera,
+        # a wiadomości biorą z nich tylko id (name_of, <@id>), więc działa to też bez podmiany
+        self.players = [discord.Object(id=i) for i in data["players"]]
+        self.round_picks = data.get("round_picks", DRAFT_ROUND_PICKS)
+        self.draft_order = data.get("draft_order", DRAFT_ORDER)
+        self.schedule = build_schedule(len(self.players), self.round_picks, self.draft_order)
+        self.pick_no = data.get("pick_no", 0)
+        self.pick_mode = data.get("pick_mode", "turns")
+        self.window_picks = data.get("window_picks", {})
+        self.picked_numbers = PickedSet(data["picked_numbers"])
+        self.available = AvailablePlayers(data["picked_numbers"])
+        self.user_teams = data["user_teams"]
+        self.participant_ids = data.get("participant_ids", {})
+        self.picked_players = data["picked_players"]
+        self.queues = data.get("queues", {})
+        self.draft_started = data["draft_started"]
+        self.pick_deadline = _dt_from_str(data["pick_deadline"])
+        self.bonus_round_started = data["bonus_round_started"]
+        self.bonus_round_players = set(data["bonus_round_players"])
+        self.bonus_deadline = _dt_from_str(data["bonus_deadline"])
+        self.bonus_end_time = _dt_from_str(data["bonus_end_time"])
+        self.channel_id = data["channel_id"]
+        self.status_message_id = data.get("status_message_id")
+        self.catalogue_version = data.get("catalogue_version")
+        self.players_database = catalogue_for(self.catalogue_version)
+        self.invalidate_board()
+
+    def invalidate_board(self, user: Optional[str] = None):
+        if user is None:
+            self.board_lines.clear()
+        else:
+            self.board_lines.pop(user, None)
+        self.board_chunks = None
+
+    def use_catalogue(self, version: Optional[str], changed: List[int]):
+        """Przepina draft na inną wersję listy - od nowa renderowane są tylko linie graczy ze zmienionymi zawodnikami"""
+        self.catalogue_version = version
+        self.players_database = catalogue_for(version)
+        changed = set(changed)
+        for user, picks in self.picked_players.items():
+            if not changed.isdisjoint(picks):
+                self.invalidate_board(user)
+
+    def bind_members(self, members: List[discord.Member]):
+        by_id = {m.id: m for m in members}
+        self.players = [by_id.get(p.id, p) for p in self.players]
+
+    def apply(self, kind: str, data: dict):
+        """Jedyne miejsce zmiany stanu draftu - te same zdarzenia odtwarza load_draft"""
+        if kind == "start":
+            self.draft_started = True
+            self.channel_id = data["channel_id"]
+            self.players = [discord.Object(id=i) for i in data["players"]]
+            self.round_picks = data.get("round_picks", DRAFT_ROUND_PICKS)
+            self.draft_order = data.get("draft_order", DRAFT_ORDER)
+            self.schedule = build_schedule(len(self.players), self.round_picks, self.draft_order)
+            self.pick_no = 0
+            self.pick_mode = data.get("pick_mode", "turns")
+            self.catalogue_version = data.get("catalogue_version")
+            self.players_database = catalogue_for(self.catalogue_version)
+        elif kind == "turn":
+            self.pick_deadline = _dt_from_str(data["pick_deadline"])
+            self.window_picks.clear()
+        elif kind == "window_submit":
+            self.window_picks[data["user"]] = data["picks"]
+        elif kind == "pick":
+            self.picked_players.setdefault(data["user"], []).extend(data["picks"])
+            self.picked_numbers.update(data["picks"])
+            self.available.update(data["picks"])
+            self.invalidate_board(data["user"])
+            if data["user"] in self.queues:
+                self.queues[data["user"]] = [p for p in self.queues[data["user"]] if p not in data["picks"]]
+            self.pick_no += 1
+            self.pick_deadline = None  # tura zamknięta - następną otwiera zdarzenie "turn"
+        elif kind == "queue":
+            if data["queue"]:
+                self.queues[data["user"]] = data["queue"]
+            else:
+                self.queues.pop(data["user"], None)
+        elif kind == "skip":
+            self.pick_no += 1
+            self.pick_deadline = None
+        elif kind == "finish_main":
+            self.draft_started = False
+            self.bonus_round_started = True
+            self.bonus_round_players.clear()
+            self.bonus_deadline = _dt_from_str(data["bonus_deadline"])
+            self.bonus_end_time = _dt_from_str(data["bonus_end_time"])
+        elif kind == "bonus_register":
+            self.bonus_round_players.add(data["user_id"])
+        elif kind == "bonus_pick":
+            self.picked_players.setdefault(data["user"], []).extend(data["picks"])
+            self.picked_numbers.update(data["picks"])
+            self.available.update(data["picks"])
+            self.invalidate_board(data["user"])
+            self.bonus_round_players.discard(data["user_id"])
+            if not self.bonus_round_players:
+                self.bonus_round_started = False
+        elif kind == "bonus_closed":
+            self.bonus_round_started = False
+        elif kind == "teams":
+            self.user_teams = data["user_teams"]
+            self.invalidate_board()
+            self.participant_ids = {n: i for n, i in self.participant_ids.items() if n in self.user_teams}
+            self.queues = {n: q for n, q in self.queues.items() if n in self.user_teams}
+        elif kind == "bind":
+            self.participant_ids.update(data["participant_ids"])
+        elif kind == "status_message":
+            self.status_message_id = data["message_id"]
+        elif kind == "catalogue":
+            self.use_catalogue(data["version"], data["changed"])
+        elif kind == "reset":
+            self.draft_started = False
+            self.team_draft_started = True
+            self.bonus_round_started = False
+            self.players.clear()
+            self.schedule = []
+            self.pick_no = 0
+            self.window_picks.clear()
+            self.current_team_selector_index = 0
+            self.picked_numbers.clear()
+            self.available.clear()
+            self.picked_players = {name: [] for name in data["participants"]}
+            self.queues.clear()
+            self.bonus_round_players.clear()
+            self.bonus_end_time = None
+            self.pick_deadline = None
+            self.catalogue_version = None
+            self.players_database = catalogue_for(None)
+            self.invalidate_board()
+        else:
+            raise ValueError(f"Nieznane zdarzenie draftu: {kind}")
 
 # ========== STAŁE ========== #
+DEFAULT_USER_TEAMS = {
+    "ann0d0m1n1": "Ajax",            # ⚪🔴
+    "FakenSzit": "Real Madryt",      # ⚪🟣
+    "TommyAlex": "Juventus",         # ⚪⚫
+    "pogoda": "Ossasuna",            # 🔴🟣
+    "wenoid": "Galatasaray",         # 🟡🔴
+    "wordlifepl": "Celtic",          # ⚪🟢
+    "mikoprotek": "Inter",           # 🔵⚫
+}
+
 TEAM_COLORS = {
     
     "Galatasaray": ["🟡", "🔴"],
@@ -74,47 +686,1262 @@ TEAM_COLORS = {
     "AS Roma": ["🔴", "🟠"],
 }
 
-PLAYERS_URL = "https://gist.githubusercontent.com/wenowinter/c3151d1a3e34ec235176fccb91a6b107/raw/54daa05bd11b065cb52e8274961269f5efc52191/majklab.txt"
+PLAYERS_URL = os.getenv(
+    "PLAYERS_URL",
+    "https://gist.githubusercontent.com/wenowinter/c3151d1a3e34ec235176fccb91a6b107/raw/54daa05bd11b065cb52e8274961269f5efc52191/majklab.txt"
+)
+PLAYERS_CACHE_PATH = os.getenv("PLAYERS_CACHE_PATH", "players_cache.txt")
+PLAYERS_CACHE_META_PATH = PLAYERS_CACHE_PATH + ".meta.json"
+PLAYERS_CACHE_CATALOGUE_PATH = PLAYERS_CACHE_PATH + ".bin"  # ten sam katalog w formacie do mmap
+PLAYERS_FETCH_TIMEOUT = aiohttp.ClientTimeout(total=15)
+MAX_PLAYER_ID = 10_000_000  # większe (i niedodatnie) numery z listy są pomijane - to też rozmiar bitmapy wyborów
+CATALOGUE_REFRESH_INTERVAL = float(os.getenv("CATALOGUE_REFRESH_MINUTES", "30")) * 60  # 0 wyłącza odświeżanie
+CATALOGUE_VERSIONS_KEPT = 10  # tyle ostatnich wersji listy zostaje na dysku, poza nimi te z trwających draftów
+CATALOGUE_REBUILD_RATIO = 0.02  # przy większej zmianie indeks wyszukiwarki budujemy od nowa (w wątku)
+INDEX_UPDATE_BATCH = 50  # tylu zawodników przepisujemy w indeksie, zanim oddamy pętlę innym zadaniom
+DRAFT_ROUND_PICKS = parse_draft_format(os.getenv("DRAFT_FORMAT", "1*3,3*5"))  # zawodników na turę w kolejnych rundach
+DRAFT_ORDER = os.getenv("DRAFT_ORDER", "snake")  # snake - co rundę odwrotnie, linear - zawsze ta sama kolejność
+# turns - wybiera jeden gracz naraz; windows - cała runda zgłasza wybory w jednym oknie,
+# a po jego zamknięciu konflikty rozstrzyga kolejność z harmonogramu
+DRAFT_PICK_MODE = os.getenv("DRAFT_PICK_MODE", "turns")
+DEFAULT_TEAMS_CHANNEL_ID = int(os.getenv("DEFAULT_TEAMS_CHANNEL_ID", "0"))  # kanał z DEFAULT_USER_TEAMS na start - 0: żaden
+SCHEDULE_PREVIEW_LIMIT = 30
+AVAILABLE_PAGE_SIZE = 20  # zawodników na stronę !wolni
 SELECTION_TIME = timedelta(hours=16)
 BONUS_SIGNUP_TIME = timedelta(hours=10)
 BONUS_SELECTION_TIME = timedelta(hours=10)
-PARTICIPANTS = list(draft.user_teams.keys())  # Używa przypisanych graczy
+DRAFT_DB_PATH = os.getenv("DRAFT_DB_PATH", "draft.db")
+SYNC_APP_COMMANDS = os.getenv("SYNC_APP_COMMANDS", "1") == "1"  # rejestracja komend slash przy starcie
+AUTOCOMPLETE_LIMIT = 25  # tyle podpowiedzi przyjmuje Discord
+MEDIA_CONFIG_PATH = os.getenv("MEDIA_CONFIG_PATH", "media.json")  # komendy z obrazkami - !przeladuj_media wczytuje na nowo
+MEDIA_CACHE_DIR = os.getenv("MEDIA_CACHE_DIR", "media_cache")
+MEDIA_FETCH_TIMEOUT = aiohttp.ClientTimeout(total=15)
+MEDIA_MAX_SIZE = 8 * 2**20  # bajty - większy plik nie przejdzie jako załącznik
+MEMBER_CACHE_SIZE = 512
+MAX_CACHED_DRAFTS = 200  # nieaktywne drafty ponad limit są zwalniane z pamięci (zostają w bazie)
+SNAPSHOT_EVERY = 50  # co tyle zdarzeń dziennik jest kompaktowany do snapshotu
+WORKER_ID = os.getenv("WORKER_ID") or f"{socket.gethostname()}:{os.getpid()}"
+LEASE_TTL = float(os.getenv("LEASE_TTL", "30"))  # sekundy - po tylu bez odnowienia timery draftu przejmuje inny worker
+LOCK_TTL = 30.0  # sekundy - blokada draftu porzucona przez martwy worker wygasa po tym czasie
+LOCK_POLL_INTERVAL = 0.05
+STORE_BUSY_TIMEOUT = float(os.getenv("STORE_BUSY_TIMEOUT", "0.05"))  # sekundy - dłużej pętla nie czeka na bazę zajętą przez inny worker
+SYNC_INTERVAL = 2.0  # co tyle sekund worker dogania zmiany innych workerów i odnawia dzierżawy
+METRICS_HOST = os.getenv("METRICS_HOST", "127.0.0.1")
+METRICS_PORT = int(os.getenv("METRICS_PORT", "9100"))  # 0 wyłącza endpoint /metrics
+BOARD_HOST = os.getenv("BOARD_HOST", "127.0.0.1")  # na zewnątrz tylko świadomie (np. za reverse proxy)
+BOARD_PORT = int(os.getenv("BOARD_PORT", "8080"))  # 0 wyłącza stronę z tablicą draftów
+LOOP_LAG_INTERVAL = 1.0  # sekundy między pomiarami opóźnienia pętli zdarzeń
+CATALOGUE_WAIT = 30.0  # sekundy - tyle komenda poczeka na wczytanie listy zawodników po starcie
+
+# ========== METRYKI ========== #
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+class Histogram:
+    def __init__(self, buckets: Tuple[float, ...] = LATENCY_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+class Metrics:
+    """Liczniki, histogramy i odczyty w formacie tekstowym Prometheusa - tanie na tyle, by działały zawsze"""
+
+    def __init__(self):
+        self.histograms: Dict[Tuple[str, str, str], Histogram] = {}
+        self.counters: Dict[str, float] = defaultdict(float)
+        self.values: Dict[str, float] = {}
+        self.gauges: Dict[str, Callable[[], float]] = {}
+
+    def observe(self, name: str, value: float, label: str = "", label_value: str = ""):
+        key = (name, label, label_value)
+        histogram = self.histograms.get(key)
+        if histogram is None:
+            histogram = self.histograms[key] = Histogram()
+        histogram.observe(value)
+
+    def inc(self, name: str, value: float = 1):
+        self.counters[name] += value
+
+    def set(self, name: str, value: float):
+        self.values[name] = value
+
+    def gauge(self, name: str, read: Callable[[], float]):
+        """Odczyt liczony dopiero przy pobraniu /metrics"""
+        self.gauges[name] = read
+
+    def render(self) -> str:
+        lines = []
+        for (name, label, label_value), h in sorted(list(self.histograms.items()), key=lambda item: item[0]):
+            labels = f'{label}="{label_value}",' if label else ""
+            cumulative = 0
+            for bound, count in zip([*map(str, h.buckets), "+Inf"], h.counts):
+                cumulative += count
+                lines.append(f'{name}_bucket{{{labels}le="{bound}"}} {cumulative}')
+            suffix = f"{{{labels.rstrip(',')}}}" if labels else ""
+            lines.append(f"{name}_sum{suffix} {h.sum}")
+            lines.append(f"{name}_count{suffix} {h.count}")
+        for name, value in sorted(list(self.counters.items()) + list(self.values.items())):
+            lines.append(f"{name} {value}")
+        for name, read in sorted(list(self.gauges.items())):
+            try:
+                lines.append(f"{name} {read()}")
+            except Exception:
+                continue
+        return "\n".join(lines) + "\n"
+
+metrics = Metrics()
+
+def timed(name: str):
+    """Dekorator korutyn - czas wykonania trafia do histogramu draftbot_function_seconds"""
+    def decorator(func):
+        @functools.wraps(func)
+        async def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return await func(*args, **kwargs)
+            finally:
+                metrics.observe("draftbot_function_seconds", time.perf_counter() - start, "function", name)
+        return wrapper
+    return decorator
+
+async def monitor_loop_lag():
+    """Jak bardzo pętla zdarzeń spóźnia się z obudzeniem - czyli jak długo coś ją blokowało"""
+    loop = asyncio.get_running_loop()
+    while True:
+        start = loop.time()
+        await asyncio.sleep(LOOP_LAG_INTERVAL)
+        lag = max(0.0, loop.time() - start - LOOP_LAG_INTERVAL)
+        metrics.observe("draftbot_event_loop_lag_seconds", lag)
+        metrics.set("draftbot_event_loop_lag_last_seconds", lag)
+
+def start_metrics_server():
+    if not METRICS_PORT:
+        return
+    try:
+        from flask import Flask, Response
+    except ImportError:
+        print("Flask nie jest zainstalowany - endpoint /metrics wyłączony")
+        return
+
+    app = Flask("draftbot-metrics")
+    logging.getLogger("werkzeug").setLevel(logging.WARNING)
+
+    @app.route("/metrics")
+    def metrics_endpoint():
+        return Response(metrics.render(), mimetype="text/plain; version=0.0.4")
+
+    threading.Thread(
+        target=app.run,
+        kwargs={"host": METRICS_HOST, "port": METRICS_PORT, "use_reloader": False},
+        name="metrics",
+        daemon=True
+    ).start()
+    print(f"Metryki: http://{METRICS_HOST}:{METRICS_PORT}/metrics")
+
+metrics.gauge("draftbot_scheduled_timers", lambda: len(scheduler))
+metrics.gauge("draftbot_reminder_timers", lambda: sum(
+    1 for draft in list(drafts.values()) for name in list(draft.timers) if name.startswith("reminder")
+))
+metrics.gauge("draftbot_cached_drafts", lambda: len(drafts))
+metrics.gauge("draftbot_owned_drafts", lambda: sum(1 for draft in list(drafts.values()) if draft.owns_timers))
+metrics.gauge("draftbot_active_drafts", lambda: sum(1 for draft in list(drafts.values()) if draft.is_active))
+metrics.gauge("draftbot_catalogue_players", lambda: len(players_database))
+metrics.gauge("draftbot_pending_outbound_messages", lambda: sum(len(o.pending) for o in list(outboxes.values())))
+
+# ========== TRWAŁOŚĆ STANU ========== #
+class StaleDraftError(Exception):
+    """Zmiana na nieaktualnym stanie - dziennik dopisał w międzyczasie inny worker"""
+
+def is_busy(error: sqlite3.OperationalError) -> bool:
+    return error.sqlite_errorcode in (sqlite3.SQLITE_BUSY, sqlite3.SQLITE_LOCKED)
+
+class DraftStore:
+    """Dziennik zdarzeń draftu w SQLite (WAL) + okresowe snapshoty
+
+    Ten sam plik może być otwarty przez kilka workerów naraz - dzierżawy (leases) wyznaczają,
+    kto zmienia dany draft i kto pilnuje jego timerów, a dziennik pozwala pozostałym dogonić stan.
+    """
+
+    def __init__(self, path: str):
+        # Krótki busy timeout - zapytania idą na pętli zdarzeń, dłuższe czekanie jest asynchroniczne (store_retry)
+        self.conn = sqlite3.connect(path, isolation_level=None, timeout=STORE_BUSY_TIMEOUT)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS journal (
+                seq INTEGER PRIMARY KEY AUTOINCREMENT,
+                draft_key TEXT NOT NULL,
+                kind TEXT NOT NULL,
+                data TEXT NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS journal_draft ON journal (draft_key, seq);
+            CREATE TABLE IF NOT EXISTS snapshots (
+                draft_key TEXT PRIMARY KEY,
+                seq INTEGER NOT NULL,
+                state TEXT NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS heads (
+                draft_key TEXT PRIMARY KEY,
+                seq INTEGER NOT NULL,
+                active INTEGER NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS leases (
+                name TEXT PRIMARY KEY,
+                owner TEXT NOT NULL,
+                expires REAL NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS claimed_messages (
+                message_id INTEGER PRIMARY KEY,
+                claimed_at REAL NOT NULL
+            );
+            """
+        )
+        self.pending: Dict[str, int] = {}
+
+    @contextlib.contextmanager
+    def transaction(self):
+        # IMMEDIATE od razu bierze blokadę zapisu - dwa workery nie przeplotą swoich zmian
+        self.conn.execute("BEGIN IMMEDIATE")
+        try:
+            yield
+            self.conn.execute("COMMIT")
+        except BaseException:
+            self.conn.execute("ROLLBACK")
+            raise
+
+    def append(self, key: str, kind: str, data: dict, apply: Callable[[], bool], seq: int) -> int:
+        """Dopisuje zdarzenie - `apply` zmienia stan w pamięci już pod blokadą zapisu i zwraca, czy draft trwa
+
+        `seq` to ostatnie zdarzenie znane wywołującemu - gdy dziennik jest dalej, zmianę odrzuca StaleDraftError.
+        """
+        with self.transaction():
+            head = self.conn.execute("SELECT seq FROM heads WHERE draft_key = ?", (key,)).fetchone()
+            if head is not None and head[0] != seq:
+                raise StaleDraftError(f"Draft {key} zmienił inny worker (zdarzenie {head[0]}, stan z {seq})")
+            cursor = self.conn.execute(
+                "INSERT INTO journal (draft_key, kind, data) VALUES (?, ?, ?)",
+                (key, kind, json.dumps(data))
+            )
+            self.set_head(key, cursor.lastrowid, apply())
+        self.pending[key] = self.pending.get(key, 0) + 1
+        return cursor.lastrowid
+
+    def snapshot(self, key: str, state: dict, seq: int):
+        with self.transaction():
+            self.conn.execute(
+                "INSERT OR REPLACE INTO snapshots (draft_key, seq, state) VALUES (?, ?, ?)",
+                (key, seq, json.dumps(state))
+            )
+            self.conn.execute("DELETE FROM journal WHERE draft_key = ? AND seq <= ?", (key, seq))
+        self.pending[key] = 0
+
+    def load(self, key: str, after: int = 0) -> Tuple[Optional[dict], int, List[Tuple[int, str, dict]]]:
+        """Snapshot nowszy niż `after` (albo None) i zdarzenia po nim - (snapshot, jego seq, zdarzenia)"""
+        row = self.conn.execute(
+            "SELECT seq, state FROM snapshots WHERE draft_key = ? AND seq > ?", (key, after)
+        ).fetchone()
+        seq, state = (row[0], json.loads(row[1])) if row else (after, None)
+        events = [
+            (event_seq, kind, json.loads(data))
+            for event_seq, kind, data in self.conn.execute(
+                "SELECT seq, kind, data FROM journal WHERE draft_key = ? AND seq > ? ORDER BY seq",
+                (key, seq)
+            )
+        ]
+        return state, seq, events
+
+    def keys_without_head(self) -> List[str]:
+        """Drafty zapisane zanim powstała tabela heads"""
+        return [
+            row[0] for row in self.conn.execute(
+                "SELECT draft_key FROM snapshots UNION SELECT draft_key FROM journal "
+                "EXCEPT SELECT draft_key FROM heads"
+            )
+        ]
+
+    def set_head(self, key: str, seq: int, active: bool):
+        self.conn.execute(
+            "INSERT OR REPLACE INTO heads (draft_key, seq, active) VALUES (?, ?, ?)", (key, seq, int(active))
+        )
+
+    def head(self, key: str) -> Optional[int]:
+        row = self.conn.execute("SELECT seq FROM heads WHERE draft_key = ?", (key,)).fetchone()
+        return row[0] if row else None
+
+    def guild_keys(self, guild_id: int) -> List[str]:
+        return [
+            row[0] for row in self.conn.execute(
+                "SELECT draft_key FROM heads WHERE draft_key >= ? AND draft_key < ? ORDER BY draft_key",
+                (f"{guild_id}:", f"{guild_id};")  # ";" to następny znak po ":"
+            )
+        ]
+
+    def active_heads(self) -> List[Tuple[str, int]]:
+        return self.conn.execute("SELECT draft_key, seq FROM heads WHERE active = 1").fetchall()
+
+    def pinned_versions(self) -> Set[str]:
+        """Wersje listy zawodników, do których może być przypięty trwający draft (z nadmiarem)"""
+        rows = self.conn.execute(
+            """
+            SELECT json_extract(state, '$.catalogue_version') FROM snapshots
+                WHERE draft_key IN (SELECT draft_key FROM heads WHERE active = 1)
+            UNION SELECT json_extract(data, '$.catalogue_version') FROM journal
+                WHERE kind = 'start' AND draft_key IN (SELECT draft_key FROM heads WHERE active = 1)
+            UNION SELECT json_extract(data, '$.version') FROM journal
+                WHERE kind = 'catalogue' AND draft_key IN (SELECT draft_key FROM heads WHERE active = 1)
+            """
+        )
+        return {row[0] for row in rows if row[0]}
+
+    def try_lease(self, name: str, owner: str, ttl: float) -> bool:
+        """Bierze albo odnawia dzierżawę - udaje się, gdy jest wolna, wygasła lub już nasza"""
+        current = time.time()
+        with self.transaction():
+            self.conn.execute(
+                "INSERT INTO leases (name, owner, expires) VALUES (?, ?, ?) "
+                "ON CONFLICT (name) DO UPDATE SET owner = excluded.owner, expires = excluded.expires "
+                "WHERE leases.owner = excluded.owner OR leases.expires < ?",
+                (name, owner, current + ttl, current)
+            )
+            return self.conn.execute("SELECT changes()").fetchone()[0] == 1
+
+    def release(self, name: str, owner: str):
+        self.conn.execute("DELETE FROM leases WHERE name = ? AND owner = ?", (name, owner))
+
+    def release_all(self, owner: str):
+        self.conn.execute("DELETE FROM leases WHERE owner = ?", (owner,))
+
+    def claim_message(self, message_id: int) -> bool:
+        cursor = self.conn.execute(
+            "INSERT OR IGNORE INTO claimed_messages (message_id, claimed_at) VALUES (?, ?)",
+            (message_id, time.time())
+        )
+        return cursor.rowcount == 1
+
+    def prune_claims(self, older_than: float):
+        self.conn.execute("DELETE FROM claimed_messages WHERE claimed_at < ?", (time.time() - older_than,))
+
+store = DraftStore(DRAFT_DB_PATH)
+
+async def store_retry(func: Callable, *args):
+    """Wywołanie bazy, które przy zajętej bazie czeka asynchronicznie zamiast blokować pętlę"""
+    delay = LOCK_POLL_INTERVAL
+    while True:
+        try:
+            return func(*args)
+        except sqlite3.OperationalError as e:
+            if not is_busy(e):
+                raise
+        await asyncio.sleep(delay)
+        delay = min(delay * 2, 1.0)
+
+def record(state: DraftState, kind: str, **data):
+    """Zmienia stan draftu i dopisuje zdarzenie do dziennika
+
+    Zajęta baza odrzuca zdarzenie, zanim zmieni się cokolwiek w pamięci, a błąd po zmianie
+    (w apply albo przy commit) przywraca stan z dziennika - w pamięci nie zostaje nic spoza niego.
+    """
+    applied = False
+
+    def apply() -> bool:
+        nonlocal applied
+        applied = True
+        state.apply(kind, data)
+        return state.is_active
+
+    try:
+        seq = store.append(state.key, kind, data, apply, state.seq)
+    except StaleDraftError:
+        refresh_draft(state)
+        raise
+    except BaseException:
+        if applied:
+            reload_draft(state)
+        raise
+    state.seq = seq
+    if kind == "reset" or store.pending[state.key] >= SNAPSHOT_EVERY:
+        # Zdarzenie jest już w dzienniku - snapshot to tylko kompaktowanie, więc zajęta baza
+        # nie może zepsuć wyboru; pending zostaje i spróbuje następne zdarzenie
+        try:
+            store.snapshot(state.key, state.to_dict(), seq)
+        except sqlite3.OperationalError as e:
+            if not is_busy(e):
+                raise
+
+def refresh_draft(state: DraftState) -> bool:
+    """Dogania stan draftu do dziennika - zdarzenia mogły dopisać inne workery"""
+    snapshot, seq, events = store.load(state.key, after=state.seq)
+    if snapshot is None and not events:
+        return False
+    members = [p for p in state.players if hasattr(p, "mention")]
+    if snapshot is not None:
+        state.load_dict(snapshot)
+        state.seq = seq
+    for event_seq, kind, data in events:
+        state.apply(kind, data)
+        state.seq = event_seq
+    state.bind_members(members)
+    return True
+
+def reload_draft(state: DraftState):
+    """Stan draftu od nowa z dziennika - po zdarzeniu, które zmieniło pamięć, ale nie trafiło do bazy"""
+    fresh = DraftState(state.key)
+    refresh_draft(fresh)
+    members = [p for p in state.players if hasattr(p, "mention")]
+    state.load_dict(fresh.to_dict())
+    state.seq = fresh.seq
+    state.bind_members(members)
+
+@contextlib.asynccontextmanager
+async def locked(draft: DraftState):
+    """draft.lock w tym procesie i dzierżawa w bazie dla pozostałych workerów, na świeżym stanie"""
+    async with draft.lock:
+        name = f"lock:{draft.key}"
+        while not await store_retry(store.try_lease, name, WORKER_ID, LOCK_TTL):
+            await asyncio.sleep(LOCK_POLL_INTERVAL)
+        renewal = asyncio.create_task(renew_lock(name))
+        completed = False
+        try:
+            refresh_draft(draft)
+            seq_before = draft.seq
+            yield draft
+            completed = True
+        finally:
+            renewal.cancel()
+            await store_retry(store.release, name, WORKER_ID)
+            if draft.seq != seq_before:
+                schedule_status_update(draft)
+            # Komenda przerwana w połowie zostawia armed_seq w tyle - sync_drafts naprawi timery
+            if draft.owns_timers and completed:
+                draft.armed_seq = draft.seq
+
+async def renew_lock(name: str):
+    # Komenda może czekać na Discorda dłużej niż LOCK_TTL - dzierżawa nie wygasa, póki ją trzymamy.
+    # Gdyby jednak przepadła, zapis i tak odrzuci StaleDraftError (seq w DraftStore.append).
+    while True:
+        await asyncio.sleep(LOCK_TTL / 3)
+        if not await store_retry(store.try_lease, name, WORKER_ID, LOCK_TTL):
+            print(f"Dzierżawa {name} przejęta przez inny worker")
+            return
+
+def take_timer_lease(draft: DraftState) -> bool:
+    """Czy ten worker pilnuje timerów draftu - dzierżawa jest odnawiana, gdy minęła połowa jej czasu"""
+    if draft.timer_lease_until - time.monotonic() > LEASE_TTL / 2:
+        return True
+    try:
+        taken = store.try_lease(f"timers:{draft.key}", WORKER_ID, LEASE_TTL)
+    except sqlite3.OperationalError as e:
+        if not is_busy(e):
+            raise
+        return draft.owns_timers  # zajęta baza - ważna dzierżawa zostaje, odnowi ją sync_drafts
+    if taken:
+        draft.timer_lease_until = time.monotonic() + LEASE_TTL
+        return True
+    draft.timer_lease_until = 0.0
+    return False
+
+# ========== REJESTR DRAFTÓW ========== #
+# Jeden niezależny draft na kanał - klucz "guild_id:channel_id"
+drafts: "OrderedDict[str, DraftState]" = OrderedDict()
+players_database: Mapping[int, str] = Catalogue.from_pairs([])
+catalogue_version: Optional[str] = None  # wersja players_database - skrót treści listy, ten sam u każdego workera
+catalogues: Dict[str, Catalogue] = {}  # starsze wersje, do których są przypięte drafty
+
+def catalogue_for(version: Optional[str]) -> Mapping[int, str]:
+    """Katalog w danej wersji - starsze są mapowane z zapisanych kopii dopiero, gdy draft ich potrzebuje"""
+    if version is None or version == catalogue_version:
+        return players_database
+    catalogue = catalogues.get(version)
+    if catalogue is None:
+        try:
+            catalogue = catalogues[version] = Catalogue.open(catalogue_version_path(version))
+        except (OSError, ValueError, struct.error):
+            print(f"Brak wersji {version} listy zawodników - draft używa najnowszej")
+            return players_database
+    return catalogue
+
+def get_draft(ctx) -> DraftState:
+    guild_id = ctx.guild.id if ctx.guild else 0
+    return load_draft(f"{guild_id}:{ctx.channel.id}")
+
+def load_draft(key: str) -> DraftState:
+    state = drafts.get(key)
+    if state is not None:
+        drafts.move_to_end(key)
+        refresh_draft(state)
+        return state
+
+    state = DraftState(key)
+    refresh_draft(state)
+    drafts[key] = state
+    evict_idle_drafts()
+    return state
+
+def evict_idle_drafts():
+    # Zwalniamy najdawniej używane nieaktywne drafty - i tak da się je odtworzyć z bazy
+    for key in list(drafts):
+        if len(drafts) <= MAX_CACHED_DRAFTS:
+            break
+        state = drafts[key]
+        if not state.is_active and not state.lock.locked() and not state.has_pending_timers:
+            del drafts[key]
+            board_pages.pop(key, None)
+
+# ========== ZATWIERDZANIE WYBORÓW ========== #
+BONUS_PICKS = 5
+QUEUE_LIMIT = 50
+
+class PickError(Exception):
+    """Odrzucony wybór - treść wyjątku trafia na kanał"""
+
+def parse_picks(choice: str) -> List[int]:
+    try:
+        return [int(p.strip()) for p in choice.split(',')]
+    except ValueError:
+        raise PickError("Podaj numery oddzielone przecinkami")
+
+def commit_picks(draft: DraftState, kind: str, user: str, picks: List[int], expected: int, **data):
+    """Wspólna ścieżka `!wybieram` i `!wybieram_bonus`: wszystkie wybory albo żaden
+
+    Walidacja i zapis są synchroniczne (bez await pomiędzy), a wywołujący trzyma
+    locked(draft) - dwa równoczesne wybory, także z różnych workerów, nie mogą więc
+    przejść tej samej kontroli duplikatów.
+    """
+    if len(picks) != expected:
+        raise PickError(f"Wybierz dokładnie {expected} zawodników")
+
+    # Sprawdź czy są duplikaty w obecnym wyborze
+    if len(picks) != len(set(picks)):
+        raise PickError("❌ Nie możesz wybrać tego samego zawodnika więcej niż raz w tej samej turze!")
+
+    invalid = [p for p in picks if p not in draft.players_database]
+    if invalid:
+        raise PickError(f"Nieznani zawodnicy: {', '.join(map(str, invalid))}")
+
+    duplicates = [p for p in picks if p in draft.picked_numbers]
+    if duplicates:
+        raise PickError(f"Już wybrani: {', '.join(map(str, duplicates))}")
+
+    record(draft, kind, user=user, picks=picks, **data)
+
+def auto_pick(draft: DraftState, channel) -> bool:
+    """Wybór z !kolejka za gracza, który ma teraz turę - tylko gdy kolejka pokrywa całą turę"""
+    turn, player = draft.current_turn, draft.on_the_clock
+    user = draft.nick_of(player.id) if player else None
+    picks = draft.queued_picks(user, turn.picks) if user else []
+    if not user or len(picks) < turn.picks:
+        return False
+    commit_picks(draft, "pick", user, picks, turn.picks)
+    post(
+        channel,
+        f"🤖 {draft.name_of(player)} wybrał z kolejki: {', '.join(f'{p} ({draft.players_database[p]})' for p in picks)}"
+    )
+    return True
+
+# ========== TABLICA WYBORÓW ========== #
+BOARD_CHUNK_SIZE = 1900
+
+def format_board_line(draft: DraftState, user: str, picks: List[int]) -> str:
+    team = draft.user_teams.get(user, "Nieznana")
+    players = ", ".join(f"{p} ({draft.players_database.get(p, '?')})" for p in sorted(picks))
+    team_colors = "".join(TEAM_COLORS.get(team, ['⚫']))
+    return f"{team_colors} **{user}** ({team}): {players}"
+
+def render_board(draft: DraftState) -> List[str]:
+    """Części wiadomości !lista - przeliczane tylko po zmianie, linie tylko dla zmienionych graczy"""
+    if draft.board_chunks is not None:
+        return draft.board_chunks
+
+    chunks = []
+    current_chunk = ["**Wybrani zawodnicy:**"]
+    current_size = len(current_chunk[0])
+    
+    for user, picks in draft.picked_players.items():
+        if not picks:
+            continue
+
+        line = draft.board_lines.get(user)
+        if line is None:
+            line = draft.board_lines[user] = format_board_line(draft, user, picks)
+
+        if current_size + 1 + len(line) > BOARD_CHUNK_SIZE:
+            chunks.append("\n".join(current_chunk))
+            current_chunk = [line]
+            current_size = len(line)
+        else:
+            current_chunk.append(line)
+            current_size += 1 + len(line)
+
+    chunks.append("\n".join(current_chunk))
+    if len(chunks) > 1:
+        chunks = [chunk + f"\n(Część {i+1}/{len(chunks)})" for i, chunk in enumerate(chunks)]
+    draft.board_chunks = chunks
+    return chunks
+
+# ========== STRONA Z TABLICĄ ========== #
+# Widzowie zamiast !lista, !druzyny i !czas oglądają stronę. Gotowy HTML jest niezmiennym obiektem
+# dla konkretnego seq draftu - pętla bota porównuje go z głową dziennika (zmiany z innych workerów)
+# i renderuje nową wersję dopiero przy pierwszym żądaniu po zmianie, więc bez widzów nic się nie przelicza.
+BOARD_RENDER_TIMEOUT = 5.0  # sekundy
+
+class BoardPage(NamedTuple):
+    seq: int
+    etag: str
+    body: bytes
+
+board_pages: Dict[str, BoardPage] = {}
+
+def render_board_page(draft: DraftState, title: str) -> str:
+    def colors(team: Optional[str]) -> str:
+        return "".join(TEAM_COLORS.get(team, ['⚫']))
+
+    def name(player_index: int) -> str:
+        player_id = draft.players[player_index].id
+        return draft.nick_of(player_id) or str(player_id)
+
+    esc = html.escape
+    parts = [
+        '<!doctype html><html lang="pl"><head><meta charset="utf-8">',
+        '<meta http-equiv="refresh" content="60">',
+        f"<title>{esc(title)}</title></head><body>",
+        f"<h1>{esc(title)}</h1>",
+    ]
+
+    turn = draft.current_turn
+    if turn:
+        picker = "wszyscy gracze rundy (okno wyboru)" if draft.pick_mode == "windows" else name(turn.player_index)
+        parts.append(f"<p>Runda {turn.round + 1}/{len(draft.round_picks)}, tura {turn.pick_no + 1}/{len(draft.schedule)} - wybiera: <b>{esc(picker)}</b></p>")
+    elif draft.bonus_round_started:
+        parts.append(f"<p>Runda dodatkowa - zapisanych/czekających graczy: {len(draft.bonus_round_players)}</p>")
+    elif draft.players:
+        parts.append("<p>Draft zakończony</p>")
+    else:
+        parts.append("<p>Brak aktywnego draftu</p>")
+    deadline = status_deadline(draft)
+    if deadline:
+        parts.append(f'<p>Termin: <time datetime="{deadline.isoformat()}Z">{deadline:%Y-%m-%d %H:%M} UTC</time></p>')
+
+    if turn:
+        upcoming = draft.schedule[turn.pick_no:turn.pick_no + SCHEDULE_PREVIEW_LIMIT]
+        parts.append(f"<h2>Kolejność ({len(draft.schedule) - turn.pick_no} tur do końca)</h2><ol start=\"{turn.pick_no + 1}\">")
+        parts.extend(
+            f"<li>runda {t.round + 1} - {esc(name(t.player_index))} ({t.picks})</li>" for t in upcoming
+        )
+        parts.append("</ol>")
+
+    parts.append("<h2>Wybrani zawodnicy</h2><ul>")
+    for user, picks in draft.picked_players.items():
+        team = draft.user_teams.get(user, "Nieznana")
+        players = ", ".join(f"{p} ({draft.players_database.get(p, '?')})" for p in sorted(picks)) or "-"
+        parts.append(f"<li>{colors(team)} <b>{esc(user)}</b> ({esc(team)}): {esc(players)}</li>")
+    parts.append("</ul>")
+
+    parts.append("<h2>Drużyny</h2><ul>")
+    owners = {t: u for u, t in draft.user_teams.items()}
+    for team in TEAM_COLORS:
+        owner = owners.get(team)
+        parts.append(f"<li>{colors(team)} {esc(team)}" + (f" - {esc(owner)}" if owner else "") + "</li>")
+    parts.append("</ul></body></html>")
+    return "\n".join(parts)
+
+def board_title(key: str) -> str:
+    channel = bot.get_channel(int(key.split(":")[1]))
+    return f"Draft #{getattr(channel, 'name', None) or key}"
+
+def board_page(draft: DraftState) -> BoardPage:
+    """Strona draftu dla bieżącego seq - podmieniana w całości, więc wątek Flaska widzi starą albo nową"""
+    page = board_pages.get(draft.key)
+    if page is None or page.seq != draft.seq:
+        body = render_board_page(draft, board_title(draft.key)).encode()
+        page = board_pages[draft.key] = BoardPage(draft.seq, hashlib.sha1(body).hexdigest()[:16], body)
+    return page
+
+async def fresh_board_page(key: str) -> Optional[BoardPage]:
+    """Strona według głowy dziennika - draft mógł zmienić inny worker, a nieznany klucz to 404"""
+    head = store.head(key)
+    if head is None:
+        return None
+    page = board_pages.get(key)
+    if page is not None and page.seq == head:
+        return page
+    return board_page(load_draft(key))
+
+async def board_index(guild_id: int) -> List[Tuple[str, str]]:
+    return [(key, board_title(key)) for key in store.guild_keys(guild_id)]
+
+def start_board_server():
+    if not BOARD_PORT:
+        return
+    try:
+        from flask import Flask, Response, abort, request
+    except ImportError:
+        print("Flask nie jest zainstalowany - strona z tablicą wyłączona")
+        return
+
+    app = Flask("draftbot-board")
+
+    def on_bot_loop(coro):
+        return asyncio.run_coroutine_threadsafe(coro, bot.loop).result(BOARD_RENDER_TIMEOUT)
+
+    def send_page(etag: str, body: bytes):
+        metrics.inc("draftbot_board_requests_total")
+        if etag in request.if_none_match:
+            metrics.inc("draftbot_board_not_modified_total")
+            response = Response(status=304)
+        else:
+            response = Response(body, mimetype="text/html")
+        response.set_etag(etag)
+        response.headers["Cache-Control"] = "no-cache"
+        return response
+
+    @app.route("/draft/<int:guild_id>/")
+    def index_page(guild_id: int):
+        # Tylko drafty jednego serwera - bez listy wszystkich serwerów, na których jest bot
+        links = [
+            f'<li><a href="/draft/{key.replace(":", "/")}">{html.escape(title)}</a></li>'
+            for key, title in on_bot_loop(board_index(guild_id))
+        ]
+        if not links:
+            abort(404)
+        body = "\n".join(
+            ['<!doctype html><html lang="pl"><head><meta charset="utf-8"><title>Drafty</title></head><body><h1>Drafty</h1><ul>'] +
+            links +
+            ["</ul></body></html>"]
+        ).encode()
+        return send_page(hashlib.sha1(body).hexdigest()[:16], body)
+
+    @app.route("/draft/<int:guild_id>/<int:channel_id>")
+    def draft_page(guild_id: int, channel_id: int):
+        # Aktualność sprawdza pętla bota w dzienniku (baza jest jej) - renderuje tylko po zmianie
+        page = on_bot_loop(fresh_board_page(f"{guild_id}:{channel_id}"))
+        if page is None:
+            abort(404)
+        return send_page(page.etag, page.body)
+
+    threading.Thread(
+        target=app.run,
+        kwargs={"host": BOARD_HOST, "port": BOARD_PORT, "use_reloader": False},
+        name="board",
+        daemon=True
+    ).start()
+    print(f"Tablica draftów: http://{BOARD_HOST}:{BOARD_PORT}/draft/<serwer>/")
+
+# ========== KOLEJKA WIADOMOŚCI ========== #
+COALESCE_WINDOW = 0.5  # sekundy - wiadomości z tego okna idą jednym send
+MESSAGE_LIMIT = 2000
+SEND_RETRIES = 4
+SHUTDOWN_FLUSH_TIMEOUT = 10.0  # sekundy - tyle zamykany bot czeka na wysłanie kolejek (Heroku daje 30 s do SIGKILL)
+
+def pack_messages(texts: List[str], limit: int = MESSAGE_LIMIT) -> List[str]:
+    """Skleja teksty w jak najmniej wiadomości do `limit` znaków (za długie tnie po liniach)"""
+    messages, current = [], ""
+    for text in texts:
+        pieces = [text]
+        if len(text) > limit:
+            pieces, piece = [], ""
+            for line in text.split("\n"):
+                while len(line) > limit:
+                    if piece:
+                        pieces.append(piece)
+                        piece = ""
+                    pieces.append(line[:limit])
+                    line = line[limit:]
+                if piece and len(piece) + 1 + len(line) > limit:
+                    pieces.append(piece)
+                    piece = line
+                else:
+                    piece = f"{piece}\n{line}" if piece else line
+            if piece:
+                pieces.append(piece)
+        for piece in pieces:
+            if current and len(current) + 1 + len(piece) > limit:
+                messages.append(current)
+                current = piece
+            else:
+                current = f"{current}\n{piece}" if current else piece
+    if current:
+        messages.append(current)
+    return messages
+
+class Outbox:
+    """Wychodzące wiadomości jednego kanału, łączone w krótkim oknie i wysyłane po kolei"""
+
+    def __init__(self, channel):
+        self.channel = channel
+        self.pending: List[str] = []
+        self.task: Optional[asyncio.Task] = None
+
+    def post(self, text: str):
+        metrics.inc("draftbot_outbound_posts_total")
+        self.pending.append(text)
+        if self.task is None:
+            self.task = asyncio.create_task(self.run())
+
+    async def run(self):
+        try:
+            await asyncio.sleep(COALESCE_WINDOW)
+            await self.flush()
+        finally:
+            self.task = None
+            if self.pending:
+                self.task = asyncio.create_task(self.run())
+            elif outboxes.get(self.channel.id) is self:
+                del outboxes[self.channel.id]
+
+    async def flush(self):
+        while self.pending:
+            messages, self.pending = pack_messages(self.pending), []
+            for content in messages:
+                await self.send(content)
+
+    async def send(self, content: str):
+        for attempt in range(SEND_RETRIES):
+            try:
+                message = await self.channel.send(content)
+                metrics.inc("draftbot_outbound_sends_total")
+                return message
+            except discord.HTTPException as e:
+                if e.status == 429:
+                    metrics.inc("draftbot_outbound_ratelimited_total")
+                if e.status != 429 or attempt == SEND_RETRIES - 1:
+                    print(f"Nie udało się wysłać wiadomości na kanał {self.channel.id}: {e}")
+                    return None
+                # discord.py sam ponawia po 429 - tu dokładamy wykładnicze czekanie na wypadek serii
+                await asyncio.sleep(getattr(e, "retry_after", None) or 2 ** attempt)
+
+outboxes: Dict[int, Outbox] = {}
+
+def post(channel, text: str):
+    """Wysyła wiadomość przez kolejkę kanału (zamiast bezpośredniego channel.send)"""
+    outbox = outboxes.get(channel.id)
+    if outbox is None:
+        outbox = outboxes[channel.id] = Outbox(channel)
+    outbox.post(text)
+
+async def flush_outboxes():
+    """Wysyła od razu wszystko, co czeka w kolejkach (testy, zamykanie bota)"""
+    for outbox in list(outboxes.values()):
+        await outbox.flush()
+
+# ========== HARMONOGRAM ========== #
+class Timer:
+    __slots__ = ("when", "callback", "args", "cancelled")
+
+    def __init__(self, when: datetime, callback, args: tuple):
+        self.when = when
+        self.callback = callback
+        self.args = args
+        self.cancelled = False
+
+class FakeClock:
+    """Sztuczny zegar do testów - czas płynie tylko przez Scheduler.advance"""
+
+    def __init__(self, start: Optional[datetime] = None):
+        self.now = start or datetime(2024, 1, 1)
+
+    def __call__(self) -> datetime:
+        return self.now
+
+class Scheduler:
+    """Wszystkie timery wszystkich draftów na jednym kopcu (deadline, kolejność, timer)"""
+
+    def __init__(self, clock: Callable[[], datetime] = datetime.utcnow):
+        self.clock = clock
+        self.heap: List[Tuple[datetime, int, Timer]] = []
+        self.counter = itertools.count()
+        self.cancelled = 0
+        self.wakeup: Optional[asyncio.Event] = None
+        self.running: Set[asyncio.Task] = set()
+        self.task: Optional[asyncio.Task] = None
+
+    def __len__(self) -> int:
+        return len(self.heap) - self.cancelled
+
+    def schedule(self, when: datetime, callback, *args) -> Timer:
+        timer = Timer(when, callback, args)
+        heapq.heappush(self.heap, (when, next(self.counter), timer))
+        if self.wakeup and self.heap[0][2] is timer:
+            self.wakeup.set()
+        return timer
+
+    def cancel(self, timer: Optional[Timer]):
+        # Usuwanie leniwe - wpis zostaje na kopcu i jest pomijany przy zdejmowaniu
+        if timer is None or timer.cancelled:
+            return
+        timer.cancelled = True
+        self.cancelled += 1
+        if self.cancelled > 64 and self.cancelled > len(self.heap) // 2:
+            self.heap = [entry for entry in self.heap if not entry[2].cancelled]
+            heapq.heapify(self.heap)
+            self.cancelled = 0
+
+    def next_deadline(self) -> Optional[datetime]:
+        while self.heap and self.heap[0][2].cancelled:
+            heapq.heappop(self.heap)
+            self.cancelled -= 1
+        return self.heap[0][0] if self.heap else None
+
+    def run_due(self) -> List[asyncio.Task]:
+        """Odpala wszystkie timery, których termin minął - każdy we własnym tasku"""
+        fired = []
+        current = self.clock()
+        while (deadline := self.next_deadline()) is not None and deadline <= current:
+            timer = heapq.heappop(self.heap)[2]
+            timer.cancelled = True
+            task = asyncio.create_task(self._fire(timer))
+            self.running.add(task)
+            task.add_done_callback(self.running.discard)
+            fired.append(task)
+        return fired
+
+    async def _fire(self, timer: Timer):
+        try:
+            await timer.callback(*timer.args)
+        except Exception as e:
+            print(f"Błąd timera {timer.callback.__name__}: {e}")
+
+    def start(self):
+        if self.task is None:
+            self.task = asyncio.create_task(self.run())
+
+    async def run(self):
+        self.wakeup = asyncio.Event()
+        while True:
+            self.wakeup.clear()
+            self.run_due()
+            deadline = self.next_deadline()
+            timeout = None if deadline is None else max(0.0, (deadline - self.clock()).total_seconds())
+            try:
+                await asyncio.wait_for(self.wakeup.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
+
+    async def advance(self, delta: timedelta):
+        """Przesuwa FakeClock o delta, odpalając po kolei wszystko co wypada po drodze"""
+        target = self.clock.now + delta
+        while (deadline := self.next_deadline()) is not None and deadline <= target:
+            self.clock.now = max(self.clock.now, deadline)
+            await asyncio.gather(*self.run_due())
+        self.clock.now = target
+
+scheduler = Scheduler()
+
+def now() -> datetime:
+    return scheduler.clock()
+
+# ========== WYSZUKIWARKA ZAWODNIKÓW ========== #
+SEARCH_LIMIT = 10
+_LETTERS_WITHOUT_DECOMPOSITION = str.maketrans({"ł": "l", "ø": "o", "đ": "d", "ß": "ss", "æ": "ae"})
+
+def normalize_name(text: str) -> str:
+    """Małe litery bez znaków diakrytycznych - 'Błaszczykowski' -> 'blaszczykowski'"""
+    text = unicodedata.normalize("NFKD", text.lower().translate(_LETTERS_WITHOUT_DECOMPOSITION))
+    return "".join(c for c in text if not unicodedata.combining(c))
+
+class PlayerIndex:
+    """Indeks trigramów (dłuższe frazy) i prefiksów słów (1-2 znaki) nazwisk zawodników
+
+    Zawodnicy są indeksowani od najkrótszego nazwiska, więc każda lista w indeksie
+    jest już w kolejności wyników i wyszukiwanie może przerwać po pierwszych trafieniach.
+    """
+
+    def __init__(self, players: Mapping[int, str], version: Optional[str] = None):
+        # Wersja katalogu, którą indeks w całości odzwierciedla - None w trakcie aktualizacji
+        self.version = version
+        self.names: Dict[int, str] = {}
+        self.trigrams: Dict[str, List[int]] = {}
+        self.prefixes: Dict[str, List[int]] = {}
+        # Wartość dodatkowej kolumny (pozycja, klub) -> posortowane numery zawodników, dla filtra !wolni
+        self.filters: Dict[str, array] = {}
+        if isinstance(players, Catalogue) and players.has_details:
+            for player_id in players:
+                for value in {normalize_name(v) for v in players.details(player_id) if v}:
+                    self.filters.setdefault(value, array("q")).append(player_id)
+        normalized = sorted((len(norm), player_id, norm) for player_id, norm in (
+            (player_id, normalize_name(name)) for player_id, name in players.items()
+        ))
+        for _, player_id, norm in normalized:
+            self.names[player_id] = norm
+            for key in self.trigrams_of(norm):
+                self.trigrams.setdefault(key, []).append(player_id)
+            for key in self.prefixes_of(norm):
+                self.prefixes.setdefault(key, []).append(player_id)
+
+    @staticmethod
+    def trigrams_of(norm: str) -> Set[str]:
+        return {norm[i:i + 3] for i in range(len(norm) - 2)}
+
+    @staticmethod
+    def prefixes_of(norm: str) -> Set[str]:
+        return {word[:n] for word in norm.split() for n in (1, 2)}
+
+    def update(self, player_id: int, old: Catalogue, new: Catalogue):
+        """Przepisuje w miejscu wpis jednego zawodnika: usuwa opis z `old`, dodaje opis z `new`
+
+        Koszt zależy tylko od list, na których zawodnik jest - reszta indeksu zostaje nietknięta.
+        """
+        def order(pid: int):
+            return len(self.names[pid]), pid
+
+        norm = self.names.get(player_id)
+        if norm is not None:
+            # Pozycję na liście wyznacza bisect po starym nazwisku, więc usuwamy je dopiero na końcu
+            for table, keys in ((self.trigrams, self.trigrams_of(norm)), (self.prefixes, self.prefixes_of(norm))):
+                for key in keys:
+                    posting = table[key]
+                    del posting[bisect_left(posting, (len(norm), player_id), key=order)]
+                    if not posting:
+                        del table[key]
+            del self.names[player_id]
+        if old.has_details and player_id in old:
+            for value in {normalize_name(v) for v in old.details(player_id) if v}:
+                ids = self.filters[value]
+                del ids[bisect_left(ids, player_id)]
+                if not ids:
+                    del self.filters[value]
+
+        if player_id not in new:
+            return
+        norm = self.names[player_id] = normalize_name(new[player_id])
+        for table, keys in ((self.trigrams, self.trigrams_of(norm)), (self.prefixes, self.prefixes_of(norm))):
+            for key in keys:
+                insort(table.setdefault(key, []), player_id, key=order)
+        if new.has_details:
+            for value in {normalize_name(v) for v in new.details(player_id) if v}:
+                insort(self.filters.setdefault(value, array("q")), player_id)
+
+    def search(self, fragment: str, limit: int = SEARCH_LIMIT) -> List[int]:
+        """Najpierw pełne nazwisko i początki słów, potem dowolny fragment - krótsze wyżej"""
+        query = " ".join(normalize_name(fragment).split())
+        if not query:
+            return []
+        if len(query) < 3:
+            return self.prefixes.get(query, [])[:limit]
+
+        # Wystarczy najkrótsza lista trigramu - resztę załatwia sprawdzenie podciągu
+        shortest = None
+        for i in range(len(query) - 2):
+            posting = self.trigrams.get(query[i:i + 3])
+            if not posting:
+                return []
+            if shortest is None or len(posting) < len(shortest):
+                shortest = posting
+
+        best, rest = [], []
+        word_start = f" {query}"
+        for player_id in shortest:
+            name = self.names[player_id]
+            if query not in name:
+                continue
+            if name.startswith(query) or word_start in name:
+                best.append(player_id)
+                if len(best) == limit:
+                    break
+            elif len(rest) < limit:
+                rest.append(player_id)
+        return (best + rest)[:limit]
+
+player_index = PlayerIndex({})
+
+# ========== FUNKCJE POMOCNICZE ========== #
+class MemberCache:
+    """Mały LRU członków serwera rozwiązanych po ID - zamiast pełnego cache z intents.members"""
+
+    def __init__(self, size: int = MEMBER_CACHE_SIZE):
+        self.size = size
+        self.members: "OrderedDict[Tuple[int, int], discord.Member]" = OrderedDict()
+
+    def put(self, member: discord.Member):
+        key = (member.guild.id, member.id)
+        self.members[key] = member
+        self.members.move_to_end(key)
+        if len(self.members) > self.size:
+            self.members.popitem(last=False)
+
+    def refresh(self, member: discord.Member):
+        # Aktualizujemy tylko tych, których już trzymamy - zdarzenia nie rozdmuchują cache
+        if (member.guild.id, member.id) in self.members:
+            self.put(member)
+
+    def drop(self, guild_id: int, user_id: int):
+        self.members.pop((guild_id, user_id), None)
+
+    async def resolve(self, guild: discord.Guild, user_id: int) -> Optional[discord.Member]:
+        member = self.members.get((guild.id, user_id))
+        if member is None:
+            member = guild.get_member(user_id)
+        if member is None:
+            try:
+                member = await guild.fetch_member(user_id)
+            except (discord.NotFound, discord.Forbidden):
+                return None
+        self.put(member)
+        return member
+
+member_cache = MemberCache()
+
+async def find_member_ids_by_name(guild: discord.Guild, names: List[str]) -> Dict[str, int]:
+    """Jednorazowe wiązanie nicków z ID - tylko dokładne dopasowanie nazwy lub pseudonimu"""
+    found = {}
+    for name in names:
+        name_lower = name.lower()
+        try:
+            candidates = await guild.query_members(query=name, limit=10)
+        except asyncio.TimeoutError:
+            continue
+        for m in candidates:
+            if name_lower == m.display_name.lower() or name_lower == m.name.lower():
+                member_cache.put(m)
+                found[name] = m.id
+                break
+    return found
+
+def parse_players(text: str) -> Catalogue:
+    """Linie `numer nazwisko`, opcjonalnie z kolejnymi kolumnami po `|` albo tabulatorze:
+    `numer nazwisko | pozycja | klub`"""
+    pairs, out_of_range = [], 0
+    for line in text.splitlines():
+        if line.strip():
+            parts = line.strip().split(maxsplit=1)
+            if len(parts) == 2:
+                try:
+                    player_id = int(parts[0])
+                except ValueError:
+                    continue
+                if not 0 < player_id <= MAX_PLAYER_ID:
+                    out_of_range += 1
+                    continue
+                record = parts[1]
+                if "|" in record or "\t" in record:
+                    record = Catalogue.SEPARATOR.join(c.strip() for c in record.replace("\t", "|").split("|"))
+                pairs.append((player_id, record))
+    if out_of_range:
+        print(f"Pominięto {out_of_range} zawodników z numerem spoza 1..{MAX_PLAYER_ID}")
+    return Catalogue.from_pairs(pairs)
+
+def read_players_cache() -> Tuple[Optional[Catalogue], Dict[str, str]]:
+    """Zwraca zapisany katalog zawodników i nagłówki walidacji (ETag/Last-Modified)
+
+    Katalog jest mapowany z pliku .bin, a bez niego (lub gdy jest uszkodzony) parsowany z tekstu.
+    """
+    try:
+        catalogue = Catalogue.open(PLAYERS_CACHE_CATALOGUE_PATH)
+    except (OSError, ValueError, struct.error):
+        try:
+            with open(PLAYERS_CACHE_PATH, encoding="utf-8") as f:
+                catalogue = parse_players(f.read())
+        except FileNotFoundError:
+            return None, {}
+    try:
+        with open(PLAYERS_CACHE_META_PATH, encoding="utf-8") as f:
+            meta = json.load(f)
+    except (FileNotFoundError, ValueError):
+        meta = {}
+    if "version" not in meta:
+        # Kopia sprzed wersjonowania - wersję liczymy raz z tekstu i zapisujemy razem z katalogiem
+        try:
+            with open(PLAYERS_CACHE_PATH, encoding="utf-8") as f:
+                text = f.read()
+            meta["version"] = catalogue_version_of(text)
+            write_players_cache(text, catalogue, meta)
+        except OSError:
+            pass
+    return catalogue, meta
+
+def catalogue_version_of(text: str) -> str:
+    return hashlib.sha1(text.encode("utf-8")).hexdigest()[:12]
+
+def catalogue_version_path(version: str) -> str:
+    return f"{PLAYERS_CACHE_PATH}.{version}.bin"
+
+def write_players_cache(text: str, catalogue: Catalogue, meta: Dict[str, str]):
+    # Zapis przez plik tymczasowy, żeby przerwany zapis nie zostawił połowy listy.
+    # Meta idzie na końcu - pasujący ETag oznacza, że obie kopie są aktualne.
+    tmp_path = PLAYERS_CACHE_PATH + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        f.write(text)
+    os.replace(tmp_path, PLAYERS_CACHE_PATH)
+    catalogue.save(PLAYERS_CACHE_CATALOGUE_PATH)
+    if meta.get("version"):
+        catalogue.save(catalogue_version_path(meta["version"]))
+    tmp_path = PLAYERS_CACHE_META_PATH + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        f.write(json.dumps(meta))
+    os.replace(tmp_path, PLAYERS_CACHE_META_PATH)
+
+def prune_catalogue_versions(pinned: Set[str]):
+    """Usuwa najstarsze zapisane wersje listy - poza tymi, do których są przypięte trwające drafty"""
+    directory = os.path.dirname(os.path.abspath(PLAYERS_CACHE_PATH))
+    prefix = os.path.basename(PLAYERS_CACHE_PATH) + "."
+    versions = sorted(
+        (os.path.join(directory, f) for f in os.listdir(directory)
+         if f.startswith(prefix) and f.endswith(".bin") and f.count(".") == prefix.count(".") + 1),
+        key=os.path.getmtime
+    )
+    for path in versions[:-CATALOGUE_VERSIONS_KEPT]:
+        if os.path.basename(path)[len(prefix):-len(".bin")] not in pinned:
+            os.remove(path)
 
-# ========== FUNKCJE POMOCNICZE ========== #
-def find_member_by_name(members: List[discord.Member], name: str) -> discord.Member:
-    name_lower = name.lower()
-    # Najpierw szukaj dokładnego dopasowania
-    for m in members:
-        if name_lower == m.display_name.lower() or name_lower == m.name.lower():
-            return m
-    # Potem częściowe
-    for m in members:
-        if name_lower in m.display_name.lower() or name_lower in m.name.lower():
-            return m
-    return None
+async def fetch_players(meta: Dict[str, str]) -> Tuple[Optional[str], Dict[str, str]]:
+    """Pobiera listę warunkowo - zwraca (None, meta) gdy lista się nie zmieniła (304)"""
+    headers = {}
+    if meta.get("etag"):
+        headers["If-None-Match"] = meta["etag"]
+    if meta.get("last_modified"):
+        headers["If-Modified-Since"] = meta["last_modified"]
+
+    async with aiohttp.ClientSession(timeout=PLAYERS_FETCH_TIMEOUT) as session:
+        async with session.get(PLAYERS_URL, headers=headers) as response:
+            if response.status == 304:
+                return None, meta
+            response.raise_for_status()
+            text = await response.text(encoding="utf-8")
+            new_meta = {
+                key: value for key, value in (
+                    ("etag", response.headers.get("ETag")),
+                    ("last_modified", response.headers.get("Last-Modified")),
+                ) if value
+            }
+            return text, new_meta
+
+@timed("load_players")
+async def load_players() -> Tuple[Catalogue, Optional[str]]:
+    """Katalog zawodników i jego wersja - najpierw lokalna kopia, potem tylko rewalidacja u źródła"""
+    cached, meta = await asyncio.to_thread(read_players_cache)
+    if not cached:
+        cached, meta = Catalogue.from_pairs([]), {}
 
-async def load_players() -> Dict[int, str]:
     try:
-        response = requests.get(PLAYERS_URL)
-        response.raise_for_status()
-        players_dict = {}
-        for line in response.text.splitlines():
-            if line.strip():
-                parts = line.strip().split(maxsplit=1)
-                if len(parts) == 2:
-                    try:
-                        player_id = int(parts[0])
-                        players_dict[player_id] = parts[1]
-                    except ValueError:
-                        continue
-        return players_dict
+        text, new_meta = await fetch_players(meta)
     except Exception as e:
         print(f"Błąd ładowania zawodników: {e}")
-        return {i: f"Zawodnik {i}" for i in range(1, 101)}
+        if cached:
+            print(f"Używam zapisanej kopii listy zawodników ({len(cached)})")
+        return cached, meta.get("version")
+
+    if text is None:
+        return cached, meta.get("version")
+
+    catalogue = await asyncio.to_thread(parse_players, text)
+    if not catalogue:
+        print("Pobrana lista zawodników jest pusta - zostaje zapisana kopia")
+        return cached, meta.get("version")
+
+    new_meta["version"] = catalogue_version_of(text)
+    try:
+        await asyncio.to_thread(write_players_cache, text, catalogue, new_meta)
+    except OSError as e:
+        print(f"Nie udało się zapisać kopii listy zawodników: {e}")
+    return catalogue, new_meta["version"]
 
-async def schedule_reminders(channel, user, deadline):
-    for task in draft.reminder_tasks:
-        task.cancel()
+async def schedule_reminders(draft, channel, user, deadline):
+    draft.cancel_timers("reminder")
     
     reminders = [
         (deadline - timedelta(hours=8), "8 godzin"),
@@ -122,31 +1949,505 @@ async def schedule_reminders(channel, user, deadline):
         (deadline - timedelta(hours=1), "1 godzinę")
     ]
 
-    draft.reminder_tasks = [
-        asyncio.create_task(
-            send_reminder(channel, user, msg, (when - datetime.utcnow()).total_seconds())
-        )
-        for when, msg in reminders 
-        if (when - datetime.utcnow()).total_seconds() > 0
-    ]
+    for when, msg in reminders:
+        if when > now():
+            draft.arm(f"reminder {msg}", when, send_reminder, draft, channel, user, msg)
 
-async def send_reminder(channel, user, msg, wait_time):
-    await asyncio.sleep(wait_time)
+async def send_reminder(draft, channel, user, msg):
     if draft.draft_started:
-        await channel.send(f"⏰ PRZYPOMNIENIE: {user.mention} masz jeszcze {msg} na wybór!")
+        post(channel, f"⏰ PRZYPOMNIENIE: <@{user.id}> masz jeszcze {msg} na wybór!")
+
+async def sync_drafts():
+    """Dzierżawy timerów aktywnych draftów: przejęcie wolnych, odnowienie swoich i ponowne
+    ustawienie timerów, gdy stan zmienił inny worker. Po restarcie to samo odtwarza timery."""
+    active = set()
+    for key, seq in store.active_heads():
+        if bot.get_guild(int(key.split(":")[0])) is None:
+            continue  # serwer obsługuje inny shard
+        active.add(key)
+        draft = drafts.get(key)
+        if draft is not None and draft.lock.locked():
+            continue  # właśnie zmienia go komenda - wrócimy w kolejnym obiegu
+        had_lease = draft is not None and draft.owns_timers
+        if not await store_retry(store.try_lease, f"timers:{key}", WORKER_ID, LEASE_TTL):
+            if had_lease:
+                print(f"Timery draftu {key} przejął inny worker")
+                draft.timer_lease_until = 0.0
+                draft.cancel_timers()
+            continue
+        draft = load_draft(key)
+        draft.timer_lease_until = time.monotonic() + LEASE_TTL
+        if not had_lease or draft.armed_seq < draft.seq:
+            await restore_draft(draft)
+            draft.armed_seq = draft.seq
+
+    # Drafty zakończone lub zresetowane przez inne workery
+    for key, draft in list(drafts.items()):
+        if key not in active and draft.owns_timers and not draft.lock.locked():
+            refresh_draft(draft)
+            if not draft.is_active:
+                draft.cancel_timers()
+                draft.timer_lease_until = 0.0
+                store.release(f"timers:{key}", WORKER_ID)
+
+async def sync_loop():
+    for key in store.keys_without_head():
+        draft = load_draft(key)
+        store.set_head(key, draft.seq, draft.is_active)
+    while True:
+        try:
+            await sync_drafts()
+            store.prune_claims(older_than=3600)
+        except Exception as e:
+            print(f"Błąd synchronizacji draftów: {e}")
+        await asyncio.sleep(SYNC_INTERVAL)
+
+async def restore_draft(draft):
+    """Odbudowuje timery draftu z jego stanu - po restarcie albo po zmianach z innego workera"""
+    channel = bot.get_channel(draft.channel_id)
+    if channel is None:
+        print(f"Nie znaleziono kanału draftu {draft.channel_id}")
+        return
+
+    members = await asyncio.gather(*(member_cache.resolve(channel.guild, p.id) for p in draft.players))
+    draft.bind_members([m for m in members if m is not None])
+
+    if draft.draft_started and not draft.pick_deadline:
+        # Wybór zapisany, ale komenda nie zdążyła otworzyć następnej tury - robimy to tutaj
+        async with locked(draft):
+            if draft.draft_started and not draft.pick_deadline:
+                await next_pick(draft, channel)
+                return
+
+    draft.cancel_timers()
+    if draft.pick_deadline and draft.current_turn and draft.pick_mode == "windows":
+        draft.arm("pick", draft.pick_deadline, window_timer, draft, channel, draft.pick_no)
+    elif draft.pick_deadline and draft.current_turn:
+        draft.arm("pick", draft.pick_deadline, player_selection_timer, draft, channel, draft.pick_no)
+        await schedule_reminders(draft, channel, draft.on_the_clock, draft.pick_deadline)
+    elif draft.bonus_round_started:
+        if now() < draft.bonus_deadline or not draft.bonus_round_players:
+            draft.arm("pick", draft.bonus_deadline, bonus_registration_timer, draft, channel)
+        else:
+            draft.arm("pick", draft.bonus_end_time, bonus_selection_timer, draft, channel)
+    schedule_status_update(draft)
+    print(f"Timery draftu z kanału #{channel} ustawione przez {WORKER_ID}")
+
+# ========== WIADOMOŚĆ STATUSU ========== #
+# Przypięta wiadomość z bieżącym stanem zamiast ciągłego !czas. Odliczanie robi znacznik <t:…:R>
+# po stronie klienta, więc wiadomość jest edytowana tylko przy zmianie stanu (wybór, tura, koniec).
+def format_remaining(remaining: timedelta) -> str:
+    hours, remainder = divmod(max(0, int(remaining.total_seconds())), 3600)
+    mins, sec = divmod(remainder, 60)
+    return f"{hours} godzin, {mins} minut i {sec:02d} sekund"
+
+def discord_timestamp(when: datetime, style: str = "R") -> str:
+    # now() to naiwny czas UTC
+    return f"<t:{int(when.replace(tzinfo=timezone.utc).timestamp())}:{style}>"
+
+def status_deadline(draft: DraftState) -> Optional[datetime]:
+    if draft.current_turn:
+        return draft.pick_deadline
+    if draft.bonus_round_started and draft.bonus_deadline:
+        return draft.bonus_deadline if now() <= draft.bonus_deadline else draft.bonus_end_time
+    return None
+
+def render_status(draft: DraftState) -> str:
+    def name(turn: Turn) -> str:
+        player_id = draft.players[turn.player_index].id
+        return draft.nick_of(player_id) or str(player_id)
+
+    lines = ["📌 **Status draftu**"]
+    turn = draft.current_turn
+    if turn and draft.pick_mode == "windows":
+        turns = draft.window_turns()
+        submitted = sum(1 for t in turns if name(t) in draft.window_picks)
+        lines.append(f"🪟 Okno rundy {turn.round + 1}/{len(draft.round_picks)} - zgłoszenia: {submitted}/{len(turns)}")
+    elif turn:
+        lines.append(f"Runda {turn.round + 1}/{len(draft.round_picks)}, tura {turn.pick_no + 1}/{len(draft.schedule)}")
+        lines.append(f"⏰ Wybiera: **{name(turn)}** ({turn.picks} {'zawodnik' if turn.picks == 1 else 'zawodników'})")
+        upcoming = draft.schedule[turn.pick_no + 1:turn.pick_no + 4]
+        if upcoming:
+            lines.append("Następni: " + ", ".join(name(t) for t in upcoming))
+    elif draft.bonus_round_started and now() <= draft.bonus_deadline:
+        lines.append(f"🎁 Runda dodatkowa - zapisy przez `!bonus` (zapisanych: {len(draft.bonus_round_players)})")
+    elif draft.bonus_round_started:
+        lines.append(f"🎁 Runda dodatkowa - `!wybieram_bonus` (czeka jeszcze: {len(draft.bonus_round_players)})")
+    elif draft.players:
+        lines.append("🏆 Draft zakończony")
+    else:
+        lines.append("Brak aktywnego draftu - `!start` rozpoczyna nowy")
+
+    deadline = status_deadline(draft)
+    if deadline:
+        lines.append(f"Termin: {discord_timestamp(deadline, 'f')} - {discord_timestamp(deadline)}")
+    return "\n".join(lines)
+
+def schedule_status_update(draft: DraftState):
+    """Odświeżenie statusu zaraz po zmianie stanu - kilka zmian w jednej komendzie daje jedną edycję"""
+    channel = bot.get_channel(draft.channel_id) if draft.channel_id else None
+    if channel is not None and (draft.is_active or draft.status_message_id):
+        draft.arm("status", now(), update_status, draft, channel)
+
+async def publish_status(channel, message_id: Optional[int], text: str) -> Optional[int]:
+    if message_id:
+        try:
+            await channel.get_partial_message(message_id).edit(content=text)
+            metrics.inc("draftbot_status_edits_total")
+            return message_id
+        except discord.NotFound:
+            pass  # ktoś usunął wiadomość - wysyłamy nową
+    message = await channel.send(text)
+    metrics.inc("draftbot_status_messages_total")
+    try:
+        await message.pin()
+    except discord.HTTPException as e:
+        print(f"Nie udało się przypiąć statusu draftu: {e}")
+    return message.id
+
+async def update_status(draft, channel):
+    """Edytuje (albo tworzy) przypiętą wiadomość statusu - tylko gdy zmienił się jej tekst"""
+    text = render_status(draft)
+    if text != draft.status_text:
+        try:
+            message_id = await publish_status(channel, draft.status_message_id, text)
+        except discord.HTTPException as e:
+            print(f"Nie udało się odświeżyć statusu draftu: {e}")
+            message_id = draft.status_message_id
+        else:
+            draft.status_text = text
+        if message_id != draft.status_message_id:
+            async with locked(draft):
+                record(draft, "status_message", message_id=message_id)
+
+# ========== KOMENDY Z OBRAZKAMI ========== #
+# Tabela w MEDIA_CONFIG_PATH: komenda, adres i opis do !pomoc. Obrazek jest pobierany przy
+# wczytaniu tabeli (zepsuty link widać od razu), a wysyłany raz jako załącznik - potem bot
+# podaje już tylko adres tego załącznika na CDN Discorda.
+class MediaCommand:
+    def __init__(self, name: str, url: str, description: str, path: str):
+        self.name = name
+        self.url = url
+        self.description = description
+        self.path = path  # lokalna kopia obrazka
+        self.attachment_url: Optional[str] = None
+        self.attachment_expires = 0.0  # adresy załączników Discorda są podpisane i wygasają (parametr ex)
+
+media_commands: Dict[str, MediaCommand] = {}
+
+def read_media_config() -> List[dict]:
+    with open(MEDIA_CONFIG_PATH, encoding="utf-8") as f:
+        entries = json.load(f)
+    for entry in entries:
+        if not isinstance(entry, dict) or not entry.get("command") or not entry.get("url"):
+            raise ValueError(f"Niepoprawny wpis: {entry}")
+    return entries
+
+async def fetch_media(session, name: str, url: str, refresh: bool) -> Tuple[str, Optional[str]]:
+    """Ścieżka lokalnej kopii obrazka i ewentualny problem z linkiem - pobiera, gdy kopii nie ma albo `refresh`"""
+    cached = next((os.path.join(MEDIA_CACHE_DIR, f) for f in os.listdir(MEDIA_CACHE_DIR) if os.path.splitext(f)[0] == name), None)
+    if cached and not refresh:
+        return cached, None
+    try:
+        async with session.get(url) as response:
+            response.raise_for_status()
+            content_type = response.content_type
+            if not content_type.startswith("image/"):
+                raise ValueError(f"to nie obrazek ({content_type})")
+            if (response.content_length or 0) > MEDIA_MAX_SIZE:
+                raise ValueError(f"za duży plik ({response.content_length} B)")
+            data = await response.read()
+    except Exception as e:
+        if cached:
+            return cached, f"{e} - zostaje wcześniejsza kopia"
+        raise
+    if cached:
+        os.remove(cached)
+    path = os.path.join(MEDIA_CACHE_DIR, name + (mimetypes.guess_extension(content_type) or ".img"))
+    await asyncio.to_thread(write_media_file, path, data)
+    return path, None
+
+def write_media_file(path: str, data: bytes):
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(data)
+    os.replace(tmp_path, path)
+
+async def load_media(refresh: bool = False) -> List[str]:
+    """Wczytuje tabelę i rejestruje komendy od nowa - zwraca listę problemów"""
+    try:
+        entries = await asyncio.to_thread(read_media_config)
+    except (OSError, ValueError) as e:
+        return [f"{MEDIA_CONFIG_PATH}: {e}"]  # zostaje poprzednia tabela
+
+    problems, names = [], set()
+    for entry in list(entries):
+        name = entry["command"]
+        if name in names or (name not in media_commands and bot.get_command(name) is not None):
+            problems.append(f"!{name}: taka komenda już istnieje")
+            entries.remove(entry)
+        names.add(name)
+
+    os.makedirs(MEDIA_CACHE_DIR, exist_ok=True)
+    async with aiohttp.ClientSession(timeout=MEDIA_FETCH_TIMEOUT) as session:
+        results = await asyncio.gather(
+            *(fetch_media(session, e["command"], e["url"], refresh) for e in entries),
+            return_exceptions=True
+        )
+
+    loaded: Dict[str, MediaCommand] = {}
+    for entry, result in zip(entries, results):
+        name = entry["command"]
+        if isinstance(result, Exception):
+            problems.append(f"!{name}: {entry['url']} - {result}")
+            continue
+        path, problem = result
+        if problem:
+            problems.append(f"!{name}: {entry['url']} - {problem}")
+        loaded[name] = MediaCommand(name, entry["url"], entry.get("description", ""), path)
+        previous = media_commands.get(name)
+        if previous and previous.path == path and previous.url == entry["url"]:
+            loaded[name].attachment_url = previous.attachment_url
+            loaded[name].attachment_expires = previous.attachment_expires
+
+    for name in media_commands.keys() - loaded.keys():
+        bot.remove_command(name)
+    for name in loaded.keys() - media_commands.keys():
+        bot.add_command(commands.Command(media_callback(name), name=name))
+    media_commands.clear()
+    media_commands.update(loaded)
+    metrics.set("draftbot_media_commands", len(media_commands))
+    return problems
+
+def media_callback(name: str):
+    async def callback(ctx):
+        media = media_commands.get(name)
+        if media is not None:
+            await send_media(ctx, media)
+    return callback
+
+def attachment_expiry(url: str) -> float:
+    expires = parse_qs(urlparse(url).query).get("ex")
+    try:
+        return int(expires[0], 16) if expires else float("inf")
+    except ValueError:
+        return 0.0
+
+async def send_media(ctx, media: MediaCommand):
+    # Zapas godziny, żeby nie podać adresu, który wygaśnie zaraz po wysłaniu
+    if media.attachment_url and media.attachment_expires - time.time() > 3600:
+        metrics.inc("draftbot_media_cached_total")
+        return await ctx.send(media.attachment_url)
+    message = await ctx.send(file=discord.File(media.path))
+    metrics.inc("draftbot_media_uploads_total")
+    if message is not None and message.attachments:
+        media.attachment_url = message.attachments[0].url
+        media.attachment_expires = attachment_expiry(media.attachment_url)
+
+async def load_media_on_start():
+    for problem in await load_media():
+        print(f"Komenda z obrazkiem pominięta - {problem}")
+    print(f"Komendy z obrazkami: {', '.join(media_commands) or 'brak'}")
 
 # ========== KOMENDY BOTA ========== #
+draft_restored = False
+catalogue_ready = asyncio.Event()
+
+async def load_catalogue():
+    """Jednorazowe wczytanie listy zawodników przy starcie - równolegle z łączeniem z Discordem"""
+    global players_database, player_index, catalogue_version
+    load_start = time.perf_counter()
+    try:
+        catalogue, version = await load_players()
+        index = await asyncio.to_thread(PlayerIndex, catalogue, version)
+        players_database, player_index, catalogue_version = catalogue, index, version
+        for draft in drafts.values():
+            # Drafty odtworzone przed wczytaniem listy - przypięte dostają swoją wersję, reszta najnowszą
+            draft.players_database = catalogue_for(draft.catalogue_version)
+            draft.invalidate_board()
+    finally:
+        catalogue_ready.set()
+    elapsed = time.perf_counter() - load_start
+    metrics.set("draftbot_catalogue_load_seconds", elapsed)
+    print(f"Wczytano {len(players_database)} zawodników w {elapsed:.2f}s (wersja {catalogue_version or '-'})")
+    if CATALOGUE_REFRESH_INTERVAL > 0:
+        bot.catalogue_refresh_task = asyncio.create_task(catalogue_refresh_loop())
+
+async def refresh_catalogue() -> Optional[CatalogueDiff]:
+    """Podmienia katalog na nowszą wersję u źródła - bez przerywania trwających draftów
+
+    Drafty bez startu przechodzą na nową wersję od razu; rozpoczęte zostają przy swojej,
+    dopóki administrator nie wykona !aktualizuj_katalog.
+    """
+    global players_database, player_index, catalogue_version
+    catalogue, version = await load_players()
+    if version is None or version == catalogue_version or not catalogue:
+        return None
+
+    refresh_start = time.perf_counter()
+    diff = await asyncio.to_thread(catalogue_diff, players_database, catalogue)
+    if len(diff.added) + len(diff.removed) + len(diff.renamed) > CATALOGUE_REBUILD_RATIO * len(catalogue):
+        index = await asyncio.to_thread(PlayerIndex, catalogue, version)
+    else:
+        # Indeks zmieniamy w miejscu, na pętli - wyszukiwania też idą na pętli, więc nie trafią na
+        # zawodnika w połowie zmiany. Między porcjami version=None mówi, że indeks miesza dwie wersje.
+        index, index.version = player_index, None
+        for i, player_id in enumerate(diff.removed + diff.renamed + diff.added, 1):
+            index.update(player_id, players_database, catalogue)
+            if i % INDEX_UPDATE_BATCH == 0:
+                await asyncio.sleep(0)
+        index.version = version
+
+    if catalogue_version is not None:
+        catalogues[catalogue_version] = players_database
+    players_database, player_index, catalogue_version = catalogue, index, version
+    for draft in drafts.values():
+        if draft.catalogue_version is None:
+            draft.use_catalogue(None, diff.changed)
+    # Wersje, do których nie jest przypięty żaden wczytany draft, można zwolnić - w razie potrzeby są na dysku
+    pinned = {draft.catalogue_version for draft in drafts.values()}
+    for old in [v for v in catalogues if v not in pinned]:
+        del catalogues[old]
+    # Drafty innych workerów też mogą być przypięte do starej wersji - stąd dziennik, nie tylko pamięć
+    try:
+        prune_catalogue_versions(store.pinned_versions() | pinned | {version})
+    except (OSError, sqlite3.Error) as e:
+        print(f"Nie udało się usunąć starych wersji listy zawodników: {e}")
+
+    metrics.inc("draftbot_catalogue_refreshes_total")
+    metrics.set("draftbot_catalogue_refresh_seconds", time.perf_counter() - refresh_start)
+    print(
+        f"Nowa wersja listy zawodników {version}: +{len(diff.added)} -{len(diff.removed)} "
+        f"~{len(diff.renamed)} w {time.perf_counter() - refresh_start:.2f}s"
+    )
+    return diff
+
+async def catalogue_refresh_loop():
+    while True:
+        await asyncio.sleep(CATALOGUE_REFRESH_INTERVAL)
+        try:
+            if await refresh_catalogue():
+                notify_pinned_drafts()
+        except Exception as e:
+            print(f"Błąd odświeżania listy zawodników: {e}")
+
+def notify_pinned_drafts():
+    # Ogłasza tylko worker z timerami draftu, żeby kanał nie dostał tego od każdego
+    for draft in list(drafts.values()):
+        if not (draft.is_active and draft.owns_timers) or draft.catalogue_version in (None, catalogue_version):
+            continue
+        channel = bot.get_channel(draft.channel_id) if draft.channel_id else None
+        if channel:
+            post(
+                channel,
+                "📋 Jest nowsza lista zawodników - draft zostaje przy swojej, "
+                "administrator może ją zmienić komendą `!aktualizuj_katalog`"
+            )
+
+async def wait_for_catalogue(ctx):
+    # Komenda wysłana tuż po starcie czeka na listę zamiast odpowiadać "Nieznani zawodnicy"
+    if not catalogue_ready.is_set():
+        if ctx.interaction is not None:
+            await ctx.defer()  # Discord czeka na odpowiedź slash tylko 3 sekundy
+            ctx.deferred = True
+        try:
+            await asyncio.wait_for(catalogue_ready.wait(), CATALOGUE_WAIT)
+        except asyncio.TimeoutError:
+            pass
+
+async def sync_app_commands():
+    if not SYNC_APP_COMMANDS:
+        return
+    try:
+        synced = await bot.tree.sync()
+        print(f"Komendy slash: {', '.join(f'/{c.name}' for c in synced)}")
+    except discord.HTTPException as e:
+        print(f"Nie udało się zarejestrować komend slash: {e}")
+
+@bot.event
+async def setup_hook():
+    scheduler.start()
+    bot.loop_lag_task = asyncio.create_task(monitor_loop_lag())
+    bot.catalogue_task = asyncio.create_task(load_catalogue())
+    bot.media_task = asyncio.create_task(load_media_on_start())
+    bot.app_commands_task = asyncio.create_task(sync_app_commands())
+    start_metrics_server()
+    start_board_server()
+    # Heroku i systemd zatrzymują proces przez SIGTERM - zamykamy się tą samą drogą co po Ctrl+C
+    for sig in (signal.SIGTERM, signal.SIGINT):
+        with contextlib.suppress(NotImplementedError):  # Windows
+            asyncio.get_running_loop().add_signal_handler(sig, lambda: asyncio.create_task(bot.close()))
+
 @bot.event
 async def on_ready():
-    print(f'Bot {bot.user} gotowy!')
-    draft.players_database = await load_players()
+    # Wywoływane też po każdym ponownym połączeniu z gateway - tu nic się nie wczytuje od nowa
+    global draft_restored
+    if not draft_restored:
+        draft_restored = True
+        startup = time.perf_counter() - PROCESS_STARTED_AT
+        metrics.set("draftbot_startup_seconds", startup)
+        print(f'Bot {bot.user} gotowy po {startup:.2f}s!')
+        bot.sync_task = asyncio.create_task(sync_loop())
+    else:
+        print(f'Bot {bot.user} połączony ponownie')
     await bot.change_presence(activity=discord.Activity(
         type=discord.ActivityType.watching,
         name="!pomoc"
     ))
 
+@bot.event
+async def on_message(message):
+    # Workery bez shardingu dostają tę samą wiadomość - obsługuje ją ten, kto pierwszy ją zajmie
+    if message.author.bot or not (message.content.startswith(COMMAND_PREFIX) or bot.user in message.mentions):
+        return
+    if await store_retry(store.claim_message, message.id):
+        await bot.process_commands(message)
+
+@bot.before_invoke
+async def remember_author(ctx):
+    ctx.started_at = time.perf_counter()
+    if isinstance(ctx.author, discord.Member):
+        member_cache.put(ctx.author)
+
+@bot.after_invoke
+async def observe_command(ctx):
+    started_at = getattr(ctx, "started_at", None)
+    if started_at is not None:
+        elapsed = time.perf_counter() - started_at
+        metrics.observe("draftbot_command_seconds", elapsed, "command", ctx.command.qualified_name)
+    # Komenda slash musi dostać odpowiedź, a wynik wyboru idzie na kanał przez post()
+    if ctx.interaction is not None and not ctx.interaction.response.is_done():
+        await ctx.send("❌ Coś poszło nie tak" if ctx.command_failed else "✅", ephemeral=True)
+    elif getattr(ctx, "deferred", False):
+        await finish_deferred(ctx)
+
+async def finish_deferred(ctx):
+    """Zamyka "Bot myśli..." po wait_for_catalogue, jeśli komenda nie odpowiedziała przez ctx.send
+
+    Pierwsza odpowiedź po defer() zastępuje tę wiadomość - wtedy zostawiamy ją w spokoju.
+    """
+    try:
+        original = await ctx.interaction.original_response()
+        if not original.flags.loading:
+            return
+        if ctx.command_failed:
+            await ctx.interaction.edit_original_response(content="❌ Coś poszło nie tak")
+        else:
+            await ctx.interaction.delete_original_response()
+    except discord.HTTPException as e:
+        print(f"Nie udało się zamknąć odroczonej odpowiedzi /{ctx.command.qualified_name}: {e}")
+
+@bot.event
+async def on_member_update(before, after):
+    member_cache.refresh(after)
+
+@bot.event
+async def on_member_remove(member):
+    member_cache.drop(member.guild.id, member.id)
+
 @bot.command()
 async def druzyny(ctx):
+    draft = get_draft(ctx)
     teams_info = []
     for team, colors in TEAM_COLORS.items():
         owner = next((u for u, t in draft.user_teams.items() if t.lower() == team.lower()), None)
@@ -155,416 +2456,660 @@ async def druzyny(ctx):
     
     await ctx.send("**Dostępne drużyny:**\n" + "\n".join(teams_info))
 
+@bot.command()
+async def przypisz(ctx, member: discord.Member, *, team: str):
+    """Dodaje gracza do draftu na tym kanale i przypisuje mu drużynę (admin)"""
+    draft = get_draft(ctx)
+    async with locked(draft):
+        if not ctx.author.guild_permissions.administrator:
+            return await ctx.send("❌ Tylko administrator może przypisywać drużyny")
+        if draft.is_active:
+            return await ctx.send("❌ Nie można zmieniać uczestników w trakcie draftu")
+
+        team_name = next((t for t in TEAM_COLORS if t.lower() == team.lower()), None)
+        if team_name is None:
+            return await ctx.send(f"❌ Nieznana drużyna: {team}. Zobacz `!druzyny`")
+        nick = draft.nick_of(member.id) or member.name
+        owner = next((u for u, t in draft.user_teams.items() if t == team_name and u != nick), None)
+        if owner:
+            return await ctx.send(f"❌ Drużyna {team_name} jest już przypisana do {owner}")
+
+        record(draft, "teams", user_teams={**draft.user_teams, nick: team_name})
+        record(draft, "bind", participant_ids={nick: member.id})
+        member_cache.put(member)
+        await ctx.send(f"✅ {nick} gra jako {''.join(TEAM_COLORS[team_name])} {team_name}")
+
+@bot.command()
+async def wypisz(ctx, *, nick: str):
+    """Usuwa gracza z draftu na tym kanale (admin)"""
+    draft = get_draft(ctx)
+    async with locked(draft):
+        if not ctx.author.guild_permissions.administrator:
+            return await ctx.send("❌ Tylko administrator może wypisywać graczy")
+        if draft.is_active:
+            return await ctx.send("❌ Nie można zmieniać uczestników w trakcie draftu")
+        mentioned = ctx.message.raw_mentions if ctx.message else []
+        if mentioned:
+            nick = draft.nick_of(mentioned[0]) or nick
+        if nick not in draft.user_teams:
+            return await ctx.send(f"❌ {nick} nie jest uczestnikiem draftu")
+
+        record(draft, "teams", user_teams={u: t for u, t in draft.user_teams.items() if u != nick})
+        await ctx.send(f"✅ {nick} został wypisany z draftu")
+
 @bot.command()
 async def start(ctx):
     """Rozpoczyna draft od razu od wyboru zawodników (pomija wybór drużyn)"""
-    if draft.bonus_round_started and draft.bonus_end_time and datetime.utcnow() < draft.bonus_end_time:
-        remaining = draft.bonus_end_time - datetime.utcnow()
-        hours = int(remaining.total_seconds() // 3600)
-        mins = int((remaining.total_seconds() % 3600) // 60)
-        await ctx.send(f"Nie można rozpocząć nowego draftu - trwa runda dodatkowa (pozostało {hours}h {mins}m)")
-        return
+    draft = get_draft(ctx)
+    async with locked(draft):
+        if draft.bonus_round_started and draft.bonus_end_time and now() < draft.bonus_end_time:
+            remaining = draft.bonus_end_time - now()
+            hours = int(remaining.total_seconds() // 3600)
+            mins = int((remaining.total_seconds() % 3600) // 60)
+            await ctx.send(f"Nie można rozpocząć nowego draftu - trwa runda dodatkowa (pozostało {hours}h {mins}m)")
+            return
 
-    if draft.draft_started:
-        await ctx.send("Draft już trwa!")
-        return
+        if draft.draft_started:
+            await ctx.send("Draft już trwa!")
+            return
 
-    # Pomiń wybór drużyn - od razu zaczynamy draft zawodników
-    draft.draft_started = True
-    draft.players = [
-        find_member_by_name(ctx.guild.members, name)
-        for name in PARTICIPANTS
-    ]
+        if not draft.participants:
+            return await ctx.send("❌ Brak graczy w drafcie na tym kanale - dodaj ich przez `!przypisz @gracz drużyna`")
+
+        # Pomiń wybór drużyn - od razu zaczynamy draft zawodników
+        unbound = [name for name in draft.participants if name not in draft.participant_ids]
+        if unbound:
+            found = await find_member_ids_by_name(ctx.guild, unbound)
+            if found:
+                record(draft, "bind", participant_ids=found)
+
+        bound = [name for name in draft.participants if name in draft.participant_ids]
+        members = await asyncio.gather(*(
+            member_cache.resolve(ctx.guild, draft.participant_ids[name]) for name in bound
+        ))
+        missing = [name for name in draft.participants if name not in draft.participant_ids]
+        missing += [name for name, member in zip(bound, members) if member is None]
     
-    if None in draft.players:
-        missing = [name for name, member in zip(PARTICIPANTS, draft.players) if member is None]
-        await ctx.send(f"❌ Nie znaleziono graczy: {', '.join(missing)}")
-        draft.draft_started = False
-        return
+        if missing:
+            await ctx.send(f"❌ Nie znaleziono graczy: {', '.join(missing)}")
+            return
 
-    await ctx.send(
-        "🏁 **Rozpoczynamy draft zawodników!**\n"
-        "**Przypisane drużyny:**\n" +
-        "\n".join([f"- {name}: {team}" for name, team in draft.user_teams.items()]) +
-        "\n\n**Kolejność wyboru:**\n" +
-        "\n".join(f"{i+1}. {p.display_name}" for i, p in enumerate(draft.players))
-    )
-    await next_pick(ctx.channel)
+        record(
+            draft, "start",
+            channel_id=ctx.channel.id,
+            players=[m.id for m in members],
+            round_picks=DRAFT_ROUND_PICKS,
+            draft_order=DRAFT_ORDER,
+            pick_mode=DRAFT_PICK_MODE,
+            catalogue_version=catalogue_version
+        )
+        draft.bind_members(members)
 
-async def next_pick(channel):
-    if draft.current_round >= draft.total_rounds:
-        await finish_main_draft(channel)
+        post(
+            ctx.channel,
+            "🏁 **Rozpoczynamy draft zawodników!**\n"
+            "**Przypisane drużyny:**\n" +
+            "\n".join([f"- {name}: {team}" for name, team in draft.user_teams.items()]) +
+            "\n\n**Kolejność wyboru:**\n" +
+            "\n".join(f"{i+1}. {draft.name_of(p)}" for i, p in enumerate(draft.players))
+        )
+        await next_pick(draft, ctx.channel)
+
+@timed("next_pick")
+async def next_pick(draft, channel):
+    turn = draft.current_turn
+    if turn is None:
+        await finish_main_draft(draft, channel)
         return
 
-    if draft.current_index >= len(draft.players):
-        draft.current_round += 1
-        draft.current_index = 0
-        
-        if draft.current_round >= draft.total_rounds:
-            await finish_main_draft(channel)
-            return
-        
-        if draft.current_round > 0:
-            draft.players.reverse()
-            await channel.send(f"🔄 **ROTACJA KOLEJNOŚCI** - Nowa runda #{draft.current_round + 1}")
-            
-    player = draft.players[draft.current_index]
-    team = draft.user_teams.get(player.display_name.lower(), "Nieznana")
-    
-    picks_per_player = 1 if draft.current_round < 3 else 3
+    if turn.pick_no > 0 and draft.schedule[turn.pick_no - 1].round != turn.round:
+        if draft.draft_order == "snake":
+            post(channel, f"🔄 **ROTACJA KOLEJNOŚCI** - Nowa runda #{turn.round + 1}")
+        else:
+            post(channel, f"**Nowa runda #{turn.round + 1}**")
+
+    record(draft, "turn", pick_no=turn.pick_no, pick_deadline=_dt_to_str(now() + SELECTION_TIME))
+    if draft.pick_mode == "windows":
+        return await open_window(draft, channel)
+    if auto_pick(draft, channel):
+        return await next_pick(draft, channel)
+
+    player = draft.on_the_clock
+    team = draft.user_teams.get(draft.nick_of(player.id), "Nieznana")
     
-    await channel.send(
-        f"{''.join(TEAM_COLORS.get(team, ['⚫']))} {player.mention}, wybierz "
-        f"{picks_per_player} zawodników ({SELECTION_TIME.seconds//3600} godzin)!"
+    post(
+        channel,
+        f"{''.join(TEAM_COLORS.get(team, ['⚫']))} <@{player.id}>, wybierz "
+        f"{turn.picks} zawodników ({SELECTION_TIME.seconds//3600} godzin)!"
     )
 
-    draft.pick_deadline = datetime.utcnow() + SELECTION_TIME
-    if draft.pick_timer_task:
-        draft.pick_timer_task.cancel()
-    
-    draft.pick_timer_task = asyncio.create_task(
-        player_selection_timer(channel, player)
+    draft.arm("pick", draft.pick_deadline, player_selection_timer, draft, channel, turn.pick_no)
+    await schedule_reminders(draft, channel, player, draft.pick_deadline)
+
+async def player_selection_timer(draft, channel, pick_no):
+    async with locked(draft):
+        if draft.current_turn and draft.pick_no == pick_no:
+            player = draft.on_the_clock
+            if not auto_pick(draft, channel):
+                post(channel, f"⏰ Czas minął! <@{player.id}> nie wybrał zawodnika.")
+                record(draft, "skip")
+            await next_pick(draft, channel)
+
+async def open_window(draft, channel):
+    turns = draft.window_turns()
+    post(
+        channel,
+        f"🪟 **Okno wyboru - runda #{turns[0].round + 1}** ({SELECTION_TIME.seconds//3600} godzin)\n"
+        f"Każdy wysyła `!wybieram` z zawodnikami w kolejności preferencji - co najmniej "
+        f"{turns[0].picks}, zapasowi przydają się przy konfliktach.\n"
+        "Pierwszeństwo przy konfliktach: " +
+        ", ".join(f"<@{draft.players[t.player_index].id}>" for t in turns)
     )
-    await schedule_reminders(channel, player, draft.pick_deadline)
+    if window_ready(draft):
+        return await close_window(draft, channel)
+    draft.arm("pick", draft.pick_deadline, window_timer, draft, channel, turns[0].pick_no)
 
-async def player_selection_timer(channel, player):
-    await asyncio.sleep((draft.pick_deadline - datetime.utcnow()).total_seconds())
-    
-    if (draft.draft_started and 
-        draft.current_index < len(draft.players) and 
-        draft.players[draft.current_index] == player):
-        
-        await channel.send(f"⏰ Czas minął! {player.mention} nie wybrał zawodnika.")
-        draft.current_index += 1
-        await next_pick(channel)
-
-async def finish_main_draft(channel):
-    draft.draft_started = False
-    draft.bonus_round_started = True
-    draft.bonus_round_players.clear()
-    draft.bonus_deadline = datetime.utcnow() + BONUS_SIGNUP_TIME
-    draft.bonus_end_time = datetime.utcnow() + BONUS_SIGNUP_TIME + BONUS_SELECTION_TIME
+def window_ready(draft) -> bool:
+    """Okno można zamknąć wcześniej, gdy każdy gracz rundy ma zgłoszenie albo wystarczającą kolejkę"""
+    for turn in draft.window_turns():
+        user = draft.nick_of(draft.players[turn.player_index].id)
+        if user not in draft.window_picks and len(draft.queued_picks(user, turn.picks)) < turn.picks:
+            return False
+    return True
+
+async def window_timer(draft, channel, pick_no):
+    async with locked(draft):
+        if draft.current_turn and draft.pick_no == pick_no:
+            await close_window(draft, channel)
+
+async def close_window(draft, channel):
+    """Rozstrzyga rundę: gracze po kolei według harmonogramu dostają pierwsze wolne numery ze swoich list"""
+    lines = [f"🪟 **Okno rundy #{draft.current_turn.round + 1} zamknięte:**"]
+    for turn in draft.window_turns():
+        player = draft.players[turn.player_index]
+        user = draft.nick_of(player.id)
+        picks = draft.queued_picks(user, turn.picks) if user else []
+        if len(picks) == turn.picks:
+            commit_picks(draft, "pick", user, picks, turn.picks)
+            lines.append(f"✅ {user}: {', '.join(f'{p} ({draft.players_database[p]})' for p in picks)}")
+        else:
+            record(draft, "skip")
+            lines.append(f"⏰ {user or f'<@{player.id}>'}: za mało wolnych zawodników na liście (potrzeba {turn.picks}) - tura przepada")
+    post(channel, "\n".join(lines))
+    await next_pick(draft, channel)
+
+async def finish_main_draft(draft, channel):
+    record(
+        draft, "finish_main",
+        bonus_deadline=_dt_to_str(now() + BONUS_SIGNUP_TIME),
+        bonus_end_time=_dt_to_str(now() + BONUS_SIGNUP_TIME + BONUS_SELECTION_TIME)
+    )
     
-    await channel.send(
+    post(
+        channel,
         "🏁 **Draft podstawowy zakończony!**\n\n"
         "Rozpoczyna się runda dodatkowa. Wpisz **!bonus** w ciągu następnych "
-        f"**{BONUS_SIGNUP_TIME.seconds//3600} godzin**, aby wybrać dodatkowych 5 zawodników."
+        f"**{BONUS_SIGNUP_TIME.seconds//3600} godzin**, aby wybrać dodatkowych {BONUS_PICKS} zawodników."
     )
     
-    if draft.pick_timer_task:
-        draft.pick_timer_task.cancel()
-    
-    draft.pick_timer_task = asyncio.create_task(
-        bonus_registration_timer(channel)
-    )
+    draft.cancel_timers()
+    draft.arm("pick", draft.bonus_deadline, bonus_registration_timer, draft, channel)
 
-async def bonus_registration_timer(channel):
-    await asyncio.sleep((draft.bonus_deadline - datetime.utcnow()).total_seconds())
-    
-    if draft.bonus_round_started:
-        if draft.bonus_round_players:
-            players_list = ", ".join([f"<@{player}>" for player in draft.bonus_round_players])
-            await channel.send(
-                f"⏰ Czas na rejestrację do rundy dodatkowej zakończony!\n"
-                f"Zarejestrowani gracze ({len(draft.bonus_round_players)}): {players_list}\n\n"
-                f"Macie **{BONUS_SELECTION_TIME.seconds//3600} godzin** na wybranie 5 dodatkowych zawodników.\n"
-                f"Użyjcie `!wybieram_bonus [numery zawodników]`"
-            )
-            # Uruchom timer dla wyboru w rundzie bonusowej
-            draft.pick_timer_task = asyncio.create_task(
-                bonus_selection_timer(channel)
-            )
-        else:
-            await channel.send(
-                "⏰ Czas na rejestrację do rundy dodatkowej zakończony!\n"
-                "Nikt nie zapisał się do rundy dodatkowej.\n\n"
-                "🏆 **Draft oficjalnie zakończony!**"
-            )
-            draft.bonus_round_started = False
+async def bonus_registration_timer(draft, channel):
+    async with locked(draft):
+        if draft.bonus_round_started:
+            if draft.bonus_round_players:
+                players_list = ", ".join([f"<@{player}>" for player in draft.bonus_round_players])
+                post(
+                    channel,
+                    f"⏰ Czas na rejestrację do rundy dodatkowej zakończony!\n"
+                    f"Zarejestrowani gracze ({len(draft.bonus_round_players)}): {players_list}\n\n"
+                    f"Macie **{BONUS_SELECTION_TIME.seconds//3600} godzin** na wybranie {BONUS_PICKS} dodatkowych zawodników.\n"
+                    f"Użyjcie `!wybieram_bonus [numery zawodników]`"
+                )
+                # Uruchom timer dla wyboru w rundzie bonusowej
+                draft.arm("pick", draft.bonus_end_time, bonus_selection_timer, draft, channel)
+                schedule_status_update(draft)  # zapisy -> wybór to zmiana etapu bez zdarzenia w dzienniku
+            else:
+                post(
+                    channel,
+                    "⏰ Czas na rejestrację do rundy dodatkowej zakończony!\n"
+                    "Nikt nie zapisał się do rundy dodatkowej.\n\n"
+                    "🏆 **Draft oficjalnie zakończony!**"
+                )
+                record(draft, "bonus_closed")
 
-async def bonus_selection_timer(channel):
-    await asyncio.sleep((draft.bonus_end_time - datetime.utcnow()).total_seconds())
-    
-    if draft.bonus_round_started:
-        # Zakończ rundę bonusową jeśli czas minął
-        draft.bonus_round_started = False
-        await channel.send("⏰ Czas na wybór w rundzie dodatkowej zakończony!")
+async def bonus_selection_timer(draft, channel):
+    async with locked(draft):
+        if draft.bonus_round_started:
+            # Zakończ rundę bonusową jeśli czas minął
+            record(draft, "bonus_closed")
+            post(channel, "⏰ Czas na wybór w rundzie dodatkowej zakończony!")
 
 @bot.command()
 async def bonus(ctx):
-    if not draft.bonus_round_started:
-        return await ctx.send("Runda dodatkowa nie jest aktywna!")
-    
-    if datetime.utcnow() > draft.bonus_deadline:
-        return await ctx.send("Czas na rejestrację do rundy dodatkowej już minął!")
-    
-    user_id = str(ctx.author.id)
-    if user_id in draft.bonus_round_players:
-        return await ctx.send("Już jesteś zarejestrowany do rundy dodatkowej!")
+    draft = get_draft(ctx)
+    async with locked(draft):
+        if not draft.bonus_round_started:
+            return await ctx.send("Runda dodatkowa nie jest aktywna!")
     
-    participant_names = [p.display_name.lower() for p in draft.players]
-    if ctx.author.display_name.lower() not in participant_names:
-        return await ctx.send("Tylko uczestnicy draftu mogą zapisać się do rundy dodatkowej!")
+        if now() > draft.bonus_deadline:
+            return await ctx.send("Czas na rejestrację do rundy dodatkowej już minął!")
     
-    draft.bonus_round_players.add(user_id)
-    remaining = (draft.bonus_deadline - datetime.utcnow()).total_seconds()
-    hours, remainder = divmod(int(remaining), 3600)
-    mins, secs = divmod(remainder, 60)
+        user_id = str(ctx.author.id)
+        if user_id in draft.bonus_round_players:
+            return await ctx.send("Już jesteś zarejestrowany do rundy dodatkowej!")
     
-    await ctx.send(
-        f"✅ {ctx.author.mention} został zarejestrowany do rundy dodatkowej!\n"
-        f"Pozostały czas na rejestrację: {hours} godzin, {mins} minut i {secs} sekund.\n"
-        f"Po zakończeniu rejestracji będziesz mieć {BONUS_SELECTION_TIME.seconds//3600} godzin na wybranie 5 dodatkowych zawodników."
-    )
-
-@bot.command()
-async def wybieram_bonus(ctx, *, choice):
-    if not draft.bonus_round_started:
-        return await ctx.send("Runda dodatkowa nie jest aktywna!")
+        if ctx.author.id not in {p.id for p in draft.players}:
+            return await ctx.send("Tylko uczestnicy draftu mogą zapisać się do rundy dodatkowej!")
     
-    user_id = str(ctx.author.id)
-    if user_id not in draft.bonus_round_players:
-        return await ctx.send("Nie jesteś zarejestrowany w rundzie dodatkowej! Użyj najpierw !bonus")
-    
-    if datetime.utcnow() <= draft.bonus_deadline:
-        return await ctx.send(
-            "Rejestracja do rundy dodatkowej wciąż trwa. Poczekaj na jej zakończenie aby wybrać zawodników!"
+        record(draft, "bonus_register", user_id=user_id)
+        post(
+            ctx.channel,
+            f"✅ {ctx.author.mention} został zarejestrowany do rundy dodatkowej!\n"
+            f"Pozostały czas na rejestrację: {format_remaining(draft.bonus_deadline - now())}.\n"
+            f"Po zakończeniu rejestracji będziesz mieć {BONUS_SELECTION_TIME.seconds//3600} godzin na wybranie {BONUS_PICKS} dodatkowych zawodników."
         )
+
+async def picks_autocomplete(interaction: discord.Interaction, current: str) -> List[app_commands.Choice[str]]:
+    """Podpowiedzi dla ostatniego numeru na liście: wolni zawodnicy po numerze albo nazwisku,
+    a przy pustym polu najpierw własna !kolejka. Bez sieci i bez skanowania katalogu."""
+    started = time.perf_counter()
+    draft = load_draft(f"{interaction.guild_id or 0}:{interaction.channel_id}")
+    head, _, fragment = current.rpartition(",")
+    fragment = fragment.strip()
+    chosen = {int(p) for p in head.replace(" ", "").split(",") if p.isdigit()}
+
+    def free(player_id: int) -> bool:
+        return player_id in draft.players_database and player_id not in draft.picked_numbers and player_id not in chosen
+
+    if not fragment:
+        user = draft.nick_of(interaction.user.id)
+        candidates = [p for p in draft.queues.get(user, []) if free(p)]
+        candidates += draft.available.page(draft.players_database.ids, 0, AUTOCOMPLETE_LIMIT + len(chosen))[1]
+    elif fragment.isdigit():
+        candidates = [int(fragment)]
+    else:
+        candidates = player_index.search(fragment, limit=AUTOCOMPLETE_LIMIT * 2)
+
+    prefix = f"{head.strip()}, " if head.strip() else ""
+    choices = []
+    for p in dict.fromkeys(candidates):
+        if free(p):
+            choices.append(app_commands.Choice(name=f"{p} - {draft.players_database[p]}"[:100], value=f"{prefix}{p}"[:100]))
+            if len(choices) == AUTOCOMPLETE_LIMIT:
+                break
+    metrics.observe("draftbot_autocomplete_seconds", time.perf_counter() - started)
+    return choices
+
+@bot.hybrid_command()
+@commands.before_invoke(wait_for_catalogue)
+@app_commands.rename(choice="zawodnicy")
+@app_commands.describe(choice="Numery zawodników oddzielone przecinkami - podpowiedzi po numerze lub nazwisku")
+async def wybieram_bonus(ctx, *, choice: str):
+    """Wybiera dodatkowych zawodników w rundzie dodatkowej"""
+    draft = get_draft(ctx)
+    async with locked(draft):
+        if not draft.bonus_round_started:
+            return await ctx.send("Runda dodatkowa nie jest aktywna!")
     
-    try:
-        picks = [int(p.strip()) for p in choice.split(',')]
-    except ValueError:
-        return await ctx.send("Podaj numery oddzielone przecinkami")
-    
-    if len(picks) != 5:
-        return await ctx.send("Wybierz dokładnie 5 zawodników")
-    
-    # Sprawdź czy są duplikaty w obecnym wyborze
-    if len(picks) != len(set(picks)):
-        return await ctx.send("❌ Nie możesz wybrać tego samego zawodnika więcej niż raz w tej samej turze!")
-    
-    invalid = [p for p in picks if p not in draft.players_database]
-    if invalid:
-        return await ctx.send(f"Nieznani zawodnicy: {', '.join(map(str, invalid))}")
-    
-    duplicates = [p for p in picks if p in draft.picked_numbers]
-    if duplicates:
-        return await ctx.send(f"Już wybrani: {', '.join(map(str, duplicates))}")
-    
-    user_name = ctx.author.display_name.lower()
-    if user_name not in draft.picked_players:
-        draft.picked_players[user_name] = []
+        user_id = str(ctx.author.id)
+        if user_id not in draft.bonus_round_players:
+            return await ctx.send("Nie jesteś zarejestrowany w rundzie dodatkowej! Użyj najpierw !bonus")
     
-    draft.picked_players[user_name].extend(picks)
-    draft.picked_numbers.update(picks)
+        if now() <= draft.bonus_deadline:
+            return await ctx.send(
+                "Rejestracja do rundy dodatkowej wciąż trwa. Poczekaj na jej zakończenie aby wybrać zawodników!"
+            )
     
-    await ctx.send(
-        f"✅ {ctx.author.display_name} wybrał dodatkowych zawodników w rundzie bonusowej: "
-        f"{', '.join(f'{p} ({draft.players_database[p]})' for p in picks)}"
-    )
+        user = draft.nick_of(ctx.author.id) or ctx.author.display_name
+        try:
+            picks = parse_picks(choice)
+            commit_picks(draft, "bonus_pick", user, picks, BONUS_PICKS, user_id=user_id)
+        except PickError as e:
+            return await ctx.send(str(e))
     
-    draft.bonus_round_players.remove(user_id)
+        post(
+            ctx.channel,
+            f"✅ {ctx.author.display_name} wybrał dodatkowych zawodników w rundzie bonusowej: "
+            f"{', '.join(f'{p} ({draft.players_database[p]})' for p in picks)}"
+        )
     
-    if not draft.bonus_round_players:
-        draft.bonus_round_started = False
-        await ctx.send("🏆 **Wszystkie wybory zostały dokonane. Draft oficjalnie zakończony!**")
+        if not draft.bonus_round_started:
+            post(ctx.channel, "🏆 **Wszystkie wybory zostały dokonane. Draft oficjalnie zakończony!**")
 
-@bot.command()
-async def wybieram(ctx, *, choice):
+wybieram_bonus.autocomplete("choice")(picks_autocomplete)
+
+@bot.hybrid_command()
+@commands.before_invoke(wait_for_catalogue)
+@app_commands.rename(choice="zawodnicy")
+@app_commands.describe(choice="Numery zawodników oddzielone przecinkami - podpowiedzi po numerze lub nazwisku")
+async def wybieram(ctx, *, choice: str):
+    """Wybiera zawodników w Twojej turze (w trybie okien - lista preferencji)"""
+    draft = get_draft(ctx)
     if draft.draft_started:
-        await handle_player_selection(ctx, choice)
+        async with locked(draft):
+            await handle_player_selection(draft, ctx, choice)
     else:
         await ctx.send("Draft nie jest aktywny. Użyj !start")
 
-async def handle_player_selection(ctx, choice):
-    if not draft.draft_started or draft.current_index >= len(draft.players):
+wybieram.autocomplete("choice")(picks_autocomplete)
+
+@timed("handle_player_selection")
+async def handle_player_selection(draft, ctx, choice):
+    turn = draft.current_turn
+    if turn is None:
         return await ctx.send("Nikt teraz nie wybiera")
+    if draft.pick_mode == "windows":
+        return await submit_window_picks(draft, ctx, choice)
 
-    current_player = draft.players[draft.current_index]
-    if ctx.author != current_player:
-        return await ctx.send(f"Nie twoja kolej! Teraz wybiera {current_player.mention}")
+    current_player = draft.on_the_clock
+    if ctx.author.id != current_player.id:
+        return await ctx.send(f"Nie twoja kolej! Teraz wybiera <@{current_player.id}>")
 
+    user = draft.nick_of(ctx.author.id) or ctx.author.display_name
     try:
-        picks = [int(p.strip()) for p in choice.split(',')]
-    except ValueError:
-        return await ctx.send("Podaj numery oddzielone przecinkami")
-
-    expected = 1 if draft.current_round < 3 else 3
-    
-    if len(picks) != expected:
-        return await ctx.send(f"Wybierz dokładnie {expected} zawodników")
+        picks = parse_picks(choice)
+        commit_picks(draft, "pick", user, picks, turn.picks)
+    except PickError as e:
+        return await ctx.send(str(e))
     
-    # Sprawdź czy są duplikaty w obecnym wyborze
-    if len(picks) != len(set(picks)):
-        return await ctx.send("❌ Nie możesz wybrać tego samego zawodnika więcej niż raz w tej samej turze!")
+    post(
+        ctx.channel,
+        f"{ctx.author.display_name} wybrał: {', '.join(f'{p} ({draft.players_database[p]})' for p in picks)}"
+    )
+    await next_pick(draft, ctx.channel)
 
-    invalid = [p for p in picks if p not in draft.players_database]
-    if invalid:
-        return await ctx.send(f"Nieznani zawodnicy: {', '.join(map(str, invalid))}")
+def participant_nick(draft: DraftState, member) -> Optional[str]:
+    """Nick uczestnika draftu dla autora komendy - po ID, a przed !start po dokładnej nazwie"""
+    nick = draft.nick_of(member.id)
+    if nick is None:
+        names = {member.display_name.lower(), member.name.lower()}
+        nick = next((n for n in draft.participants if n.lower() in names and n not in draft.participant_ids), None)
+        if nick is not None:
+            record(draft, "bind", participant_ids={nick: member.id})
+    return nick
 
-    duplicates = [p for p in picks if p in draft.picked_numbers]
-    if duplicates:
-        return await ctx.send(f"Już wybrani: {', '.join(map(str, duplicates))}")
+@bot.group(invoke_without_command=True)
+@commands.before_invoke(wait_for_catalogue)
+async def kolejka(ctx):
+    await kolejka_show(ctx)
 
-    user_name = ctx.author.display_name.lower()
-    if user_name not in draft.picked_players:
-        draft.picked_players[user_name] = []
-    
-    draft.picked_players[user_name].extend(picks)
-    draft.picked_numbers.update(picks)
-    
-    await ctx.send(
-        f"{ctx.author.display_name} wybrał: {', '.join(f'{p} ({draft.players_database[p]})' for p in picks)}"
-    )
-    draft.current_index += 1
-    await next_pick(ctx.channel)
+@kolejka.command(name="show", aliases=["pokaz"])
+@commands.before_invoke(wait_for_catalogue)
+async def kolejka_show(ctx):
+    draft = get_draft(ctx)
+    user = draft.nick_of(ctx.author.id)
+    queue = draft.queues.get(user, []) if user else []
+    if not queue:
+        return await ctx.send("Twoja kolejka jest pusta. Dodaj zawodników: `!kolejka add 1575, 42`")
+
+    lines = [f"**📝 Kolejka {user}:**"]
+    for position, p in enumerate(queue, 1):
+        name = draft.players_database.get(p, "?")
+        if p in draft.picked_numbers:
+            lines.append(f"{position}. ~~{p} ({name})~~ - już wybrany")
+        else:
+            lines.append(f"{position}. {p} ({name})")
+    await ctx.send("\n".join(lines))
+
+@kolejka.command(name="add", aliases=["dodaj"])
+@commands.before_invoke(wait_for_catalogue)
+async def kolejka_add(ctx, *, choice):
+    draft = get_draft(ctx)
+    async with locked(draft):
+        user = participant_nick(draft, ctx.author)
+        if user is None:
+            return await ctx.send("Tylko uczestnicy draftu mogą ustawiać kolejkę!")
+        try:
+            picks = parse_picks(choice)
+        except PickError as e:
+            return await ctx.send(str(e))
+
+        invalid = [p for p in picks if p not in draft.players_database]
+        if invalid:
+            return await ctx.send(f"Nieznani zawodnicy: {', '.join(map(str, invalid))}")
+
+        queue = list(draft.queues.get(user, []))
+        queue += [p for p in dict.fromkeys(picks) if p not in queue]
+        if len(queue) > QUEUE_LIMIT:
+            return await ctx.send(f"Kolejka może mieć najwyżej {QUEUE_LIMIT} zawodników")
+        record(draft, "queue", user=user, queue=queue)
+
+        post(ctx.channel, f"📝 {ctx.author.display_name}: w kolejce {len(queue)} zawodników")
+        # Gracz, który właśnie ma turę, nie musi czekać na timer
+        player = draft.on_the_clock
+        if draft.pick_mode == "windows":
+            if draft.current_turn and window_ready(draft):
+                await close_window(draft, ctx.channel)
+        elif player is not None and player.id == ctx.author.id and auto_pick(draft, ctx.channel):
+            await next_pick(draft, ctx.channel)
+
+@kolejka.command(name="remove", aliases=["usun"])
+async def kolejka_remove(ctx, *, choice):
+    draft = get_draft(ctx)
+    async with locked(draft):
+        user = draft.nick_of(ctx.author.id)
+        if user is None or user not in draft.queues:
+            return await ctx.send("Twoja kolejka jest pusta")
+        try:
+            removed = set(parse_picks(choice))
+        except PickError as e:
+            return await ctx.send(str(e))
+
+        queue = [p for p in draft.queues[user] if p not in removed]
+        record(draft, "queue", user=user, queue=queue)
+        post(ctx.channel, f"📝 {ctx.author.display_name}: w kolejce {len(queue)} zawodników")
+
+async def submit_window_picks(draft, ctx, choice):
+    """Tryb okien: `!wybieram` zapisuje listę preferencji do rozstrzygnięcia po zamknięciu okna"""
+    turn = next((t for t in draft.window_turns() if draft.players[t.player_index].id == ctx.author.id), None)
+    if turn is None:
+        return await ctx.send("Nie bierzesz udziału w tej rundzie")
+
+    user = draft.nick_of(ctx.author.id) or ctx.author.display_name
+    try:
+        picks = parse_picks(choice)
+        if not turn.picks <= len(picks) <= QUEUE_LIMIT:
+            raise PickError(f"Podaj od {turn.picks} do {QUEUE_LIMIT} zawodników w kolejności preferencji")
+        if len(picks) != len(set(picks)):
+            raise PickError("❌ Nie możesz wybrać tego samego zawodnika więcej niż raz w tej samej turze!")
+        invalid = [p for p in picks if p not in draft.players_database]
+        if invalid:
+            raise PickError(f"Nieznani zawodnicy: {', '.join(map(str, invalid))}")
+        duplicates = [p for p in picks if p in draft.picked_numbers]
+        if duplicates:
+            raise PickError(f"Już wybrani: {', '.join(map(str, duplicates))}")
+    except PickError as e:
+        return await ctx.send(str(e))
+
+    record(draft, "window_submit", user=user, picks=picks)
+    post(ctx.channel, f"📨 {ctx.author.display_name}: zgłoszenie przyjęte ({len(picks)} zawodników) - rozstrzygnięcie po zamknięciu okna")
+    if window_ready(draft):
+        await close_window(draft, ctx.channel)
+
+@bot.command()
+async def kolejnosc(ctx, count: int = 10):
+    """Najbliższe tury - przed !start podgląd kolejności według listy uczestników"""
+    draft = get_draft(ctx)
+    count = max(1, min(count, SCHEDULE_PREVIEW_LIMIT))
+    if draft.draft_started:
+        schedule, first = draft.schedule, draft.pick_no
+        names = [draft.nick_of(p.id) or f"<@{p.id}>" for p in draft.players]
+    else:
+        schedule, first = build_schedule(len(draft.participants), DRAFT_ROUND_PICKS, DRAFT_ORDER), 0
+        names = draft.participants
+    upcoming = schedule[first:first + count]
+    if not upcoming:
+        return await ctx.send("Brak kolejnych tur w drafcie podstawowym")
+
+    lines = [f"**📅 Kolejność ({len(schedule) - first} tur do końca):**"]
+    for turn in upcoming:
+        marker = "⏰ " if draft.draft_started and turn.pick_no == draft.pick_no else ""
+        lines.append(
+            f"{marker}{turn.pick_no + 1}. runda {turn.round + 1} - {names[turn.player_index]} "
+            f"({turn.picks} {'zawodnik' if turn.picks == 1 else 'zawodników'})"
+        )
+    await ctx.send("\n".join(lines))
+
+@bot.command()
+@commands.before_invoke(wait_for_catalogue)
+async def szukaj(ctx, *, fragment: str):
+    draft = get_draft(ctx)
+    # Indeks zna najnowszą listę - draft przypięty do starszej widzi tylko swoich zawodników
+    found = [p for p in player_index.search(fragment) if p in draft.players_database]
+    if not found:
+        return await ctx.send(f"Nie znaleziono zawodników dla: {fragment}")
+
+    lines = [f"**🔎 Wyniki dla \"{fragment}\":**"]
+    for p in found:
+        if p in draft.picked_numbers:
+            lines.append(f"~~{p} ({draft.players_database[p]})~~ - już wybrany")
+        else:
+            lines.append(f"{p} ({draft.players_database[p]})")
+    await ctx.send("\n".join(lines))
 
 @bot.command()
+@commands.before_invoke(wait_for_catalogue)
+async def wolni(ctx, *, args: str = ""):
+    """!wolni [strona] [filtr] - niewybrani zawodnicy w kolejności numerów, filtr to pozycja albo klub"""
+    draft = get_draft(ctx)
+    page_arg, _, filter_arg = args.strip().partition(" ")
+    if not page_arg.isdigit():
+        page_arg, filter_arg = "1", args.strip()
+    page = max(1, int(page_arg))
+
+    ids = draft.players_database.ids
+    if filter_arg:
+        ids = player_index.filters.get(" ".join(normalize_name(filter_arg).split()))
+        if ids is None:
+            return await ctx.send(f"Brak zawodników z pozycją lub klubem: {filter_arg}")
+        if draft.players_database is not players_database or player_index.version != catalogue_version:
+            ids = array("q", (p for p in ids if p in draft.players_database))
+
+    total, found = draft.available.page(ids, (page - 1) * AVAILABLE_PAGE_SIZE, AVAILABLE_PAGE_SIZE)
+    pages = max(1, -(-total // AVAILABLE_PAGE_SIZE))
+    if not found:
+        return await ctx.send(f"Brak wolnych zawodników na stronie {page} (stron: {pages})")
+
+    title = f"**🟢 Wolni zawodnicy{f' ({filter_arg})' if filter_arg else ''}: {total}, strona {page}/{pages}**"
+    lines = [title]
+    for p in found:
+        extra = ", ".join(d for d in draft.players_database.details(p) if d)
+        lines.append(f"{p} ({draft.players_database[p]})" + (f" - {extra}" if extra else ""))
+    if page < pages:
+        lines.append(f"Następna strona: `!wolni {page + 1}{f' {filter_arg}' if filter_arg else ''}`")
+    await ctx.send("\n".join(lines))
+
+@bot.hybrid_command()
+@commands.before_invoke(wait_for_catalogue)
 async def lista(ctx):
+    """Pokazuje wybranych zawodników"""
+    draft = get_draft(ctx)
     if not draft.players_database:
         return await ctx.send("❌ Błąd: brak danych zawodników")
 
     if all(not p for p in draft.picked_players.values()):
         return await ctx.send("Nikt jeszcze nie wybrał zawodników")
 
-    chunks = []
-    current_chunk = ["**Wybrani zawodnicy:**"]
-    
-    for user, picks in draft.picked_players.items():
-        if not picks:
-            continue
-            
-        team = draft.user_teams.get(user, "Nieznana")
-        players = ", ".join(f"{p} ({draft.players_database[p]})" for p in sorted(picks))
-        team_colors = "".join(TEAM_COLORS.get(team, ['⚫']))
-        line = f"{team_colors} **{user}** ({team}): {players}"
-        
-        if len("\n".join(current_chunk + [line])) > 1900:
-            chunks.append("\n".join(current_chunk))
-            current_chunk = [line]
-        else:
-            current_chunk.append(line)
-
-    if current_chunk:
-        chunks.append("\n".join(current_chunk))
-
-    for i, chunk in enumerate(chunks):
-        await ctx.send(chunk + (f"\n(Część {i+1}/{len(chunks)})" if len(chunks) > 1 else ""))
+    for chunk in render_board(draft):
+        await ctx.send(chunk)
 
 @bot.command()
 async def reset(ctx):
-    if not ctx.author.guild_permissions.administrator:
-        return await ctx.send("❌ Tylko administrator może zresetować draft")
-
-    draft.draft_started = False
-    draft.team_draft_started = True
-    draft.bonus_round_started = False
-    draft.players.clear()
-    draft.current_index = 0
-    draft.current_round = 0
-    draft.current_team_selector_index = 0
-    draft.picked_numbers.clear()
-    draft.picked_players = {name.lower(): [] for name in PARTICIPANTS}  # RESET
-    draft.bonus_round_players.clear()
-    draft.bonus_end_time = None
-
-    if draft.pick_timer_task:
-        draft.pick_timer_task.cancel()
-    
-    for task in draft.reminder_tasks:
-        task.cancel()
-    draft.reminder_tasks.clear()
+    draft = get_draft(ctx)
+    async with locked(draft):
+        if not ctx.author.guild_permissions.administrator:
+            return await ctx.send("❌ Tylko administrator może zresetować draft")
 
-    await ctx.send("Draft zresetowany. Użyj !start, aby rozpocząć nowy draft.")
+        record(draft, "reset", participants=draft.participants)
 
-@bot.command()
+        draft.cancel_timers()
+
+        await ctx.send("Draft zresetowany. Użyj !start, aby rozpocząć nowy draft.")
+
+@bot.hybrid_command()
 async def czas(ctx):
+    """Pokazuje pozostały czas na wybór"""
+    draft = get_draft(ctx)
     if draft.bonus_round_started:
-        if datetime.utcnow() > draft.bonus_deadline and draft.bonus_end_time:
-            remaining = draft.bonus_end_time - datetime.utcnow()
+        if now() > draft.bonus_deadline and draft.bonus_end_time:
+            remaining = draft.bonus_end_time - now()
             if remaining.total_seconds() > 0:
-                hours, remainder = divmod(int(remaining.total_seconds()), 3600)
-                mins, sec = divmod(remainder, 60)
-                await ctx.send(f"⏳ Pozostały czas na wybór w rundzie dodatkowej: {hours} godzin, {mins} minut i {sec:02d} sekund")
+                await ctx.send(f"⏳ Pozostały czas na wybór w rundzie dodatkowej: {format_remaining(remaining)}")
                 return
             else:
                 await ctx.send("⏰ Runda dodatkowa zakończona!")
                 return
         
         if draft.bonus_deadline:
-            remaining = draft.bonus_deadline - datetime.utcnow()
+            remaining = draft.bonus_deadline - now()
             if remaining.total_seconds() > 0:
-                hours, remainder = divmod(int(remaining.total_seconds()), 3600)
-                mins, sec = divmod(remainder, 60)
-                await ctx.send(f"⏳ Pozostały czas na rejestrację do rundy dodatkowej: {hours} godzin, {mins} minut i {sec:02d} sekund")
+                await ctx.send(f"⏳ Pozostały czas na rejestrację do rundy dodatkowej: {format_remaining(remaining)}")
                 return
     
     if not (draft.draft_started or draft.team_draft_started) or not draft.pick_deadline:
         return await ctx.send("Brak aktywnych timerów")
 
-    remaining = draft.pick_deadline - datetime.utcnow()
+    remaining = draft.pick_deadline - now()
     if remaining.total_seconds() <= 0:
         return await ctx.send("⏰ Czas minął!")
 
-    hours, remainder = divmod(int(remaining.total_seconds()), 3600)
-    mins, sec = divmod(remainder, 60)
-    
-    time_str = f"{hours} godzin, {mins} minut i {sec:02d} sekund"
-    await ctx.send(f"⏳ Pozostały czas: {time_str}")
+    await ctx.send(f"⏳ Pozostały czas: {format_remaining(remaining)}")
 
 @bot.command()
 async def bonusstatus(ctx):
     """Pokazuje status rundy dodatkowej"""
+    draft = get_draft(ctx)
     if draft.bonus_round_started:
-        if datetime.utcnow() > draft.bonus_deadline and draft.bonus_end_time:
-            remaining = draft.bonus_end_time - datetime.utcnow()
+        if now() > draft.bonus_deadline and draft.bonus_end_time:
+            remaining = draft.bonus_end_time - now()
             if remaining.total_seconds() > 0:
-                hours, remainder = divmod(int(remaining.total_seconds()), 3600)
-                mins, sec = divmod(remainder, 60)
-                await ctx.send(f"⏳ Runda dodatkowa - czas na wybór: {hours} godzin, {mins} minut i {sec:02d} sekund")
+                await ctx.send(f"⏳ Runda dodatkowa - czas na wybór: {format_remaining(remaining)}")
             else:
                 await ctx.send("⏰ Runda dodatkowa zakończona!")
         elif draft.bonus_deadline:
-            remaining = draft.bonus_deadline - datetime.utcnow()
+            remaining = draft.bonus_deadline - now()
             if remaining.total_seconds() > 0:
-                hours, remainder = divmod(int(remaining.total_seconds()), 3600)
-                mins, sec = divmod(remainder, 60)
-                await ctx.send(f"⏳ Runda dodatkowa - czas na rejestrację: {hours} godzin, {mins} minut i {sec:02d} sekund")
+                await ctx.send(f"⏳ Runda dodatkowa - czas na rejestrację: {format_remaining(remaining)}")
             else:
                 await ctx.send("🔄 Runda dodatkowa - czas na wybór zawodników")
     else:
         await ctx.send("ℹ️ Brak aktywnej rundy dodatkowej")
 
 @bot.command()
-async def lubicz(ctx):
-    await ctx.send("https://i.ibb.co/tw1tD1Ny/412206195_1406350803614829-5742951929454962748-n-removebg-preview-1.png")
-
-@bot.command()
-async def komar(ctx):
-    await ctx.send("https://i.ibb.co/zT3813dG/1746106198604.jpg")
-
-@bot.command()
-async def papa(ctx):
-    await ctx.send("https://wykop.pl/cdn/c3201142/comment_1632743224LPCEeyBmCmXNxbUkJK3s6n,w400.gif")
-
-@bot.command()
-async def paei100(ctx):
-    await ctx.send("https://i.ibb.co/JRXhrkmx/Comment-Ql-Hxr-Fps-Ot-LG2-XTGSe-BCsn-Gk2d-Yim-ATE.jpg")
-                   
-@bot.command()
-async def boniek(ctx):
-    await ctx.send("https://cdn.laczynaspilka.pl/cms2/prod/sites/default/files/styles/bpp_large/public/2021-02/bonio.png")
-
-@bot.command()
-async def eusebio(ctx):
-    await ctx.send("https://nationalmuseumpublications.co.za/wp-content/uploads/2024/04/Eusebio-top.jpg")
+async def przeladuj_media(ctx):
+    """Ponownie wczytuje tabelę komend z obrazkami i pobiera obrazki (admin)"""
+    if not ctx.author.guild_permissions.administrator:
+        return await ctx.send("❌ Tylko administrator może przeładować komendy z obrazkami")
+    problems = await load_media(refresh=True)
+    lines = [f"🖼️ Komendy z obrazkami: {', '.join(f'!{name}' for name in media_commands) or 'brak'}"]
+    lines += [f"⚠️ {problem}" for problem in problems]
+    await ctx.send("\n".join(lines))
 
 @bot.command()
-async def nazario(ctx):
-    await ctx.send("https://a.allegroimg.com/s512/118e5b/252f2287456f94a14902af7ff206/Plakat-RONALDO-NAZARIO-PILKA-NOZNA-100x70-cm-95")
-    
-
+async def aktualizuj_katalog(ctx, option: str = ""):
+    """Przepina trwający draft na najnowszą listę zawodników (admin) - `wymus` pozwala usunąć wybranych"""
+    if not ctx.author.guild_permissions.administrator:
+        return await ctx.send("❌ Tylko administrator może zmienić listę zawodników draftu")
+    draft = get_draft(ctx)
+    async with locked(draft):
+        # Przypięcie trwa też w rundzie dodatkowej i po drafcie - liczy się tylko wersja
+        if draft.catalogue_version in (None, catalogue_version):
+            return await ctx.send("ℹ️ Draft używa już najnowszej listy zawodników")
 
+        diff = await asyncio.to_thread(catalogue_diff, draft.players_database, players_database)
+        lost = [p for p in diff.removed if p in draft.picked_numbers]
+        if lost and option.lower() != "wymus":
+            return await ctx.send(
+                f"⚠️ Nowa lista nie zawiera wybranych już zawodników: {', '.join(map(str, lost))}\n"
+                f"Użyj `!aktualizuj_katalog wymus`, żeby mimo to zmienić listę"
+            )
+        record(draft, "catalogue", version=catalogue_version, changed=diff.changed)
+    await ctx.send(
+        f"📋 Draft używa najnowszej listy zawodników: +{len(diff.added)} nowych, "
+        f"-{len(diff.removed)} usuniętych, ~{len(diff.renamed)} zmienionych"
+    )
 
 @bot.command()
 async def pomoc(ctx):
@@ -574,18 +3119,23 @@ async def pomoc(ctx):
         "• `!bonus` - Zapisuje Cię do rundy dodatkowej",
         "• `!bonusstatus` - Pokazuje status rundy dodatkowej",
         "• `!druzyny` - Pokazuje dostępne drużyny",
-        "• `!wybieram [numery]` - Wybiera zawodników (np. `!wybieram 1575, 42`)",
+        "• `!wybieram [numery]` - Wybiera zawodników (np. `!wybieram 1575, 42`); w trybie okien - lista preferencji",
         "• `!wybieram_bonus [numery]` - Wybiera dodatkowych zawodników",
         "• `!lista` - Pokazuje wybranych zawodników",
+        "• `!szukaj [nazwisko]` - Szuka zawodników po nazwisku",
+        "• `!wolni [strona] [pozycja/klub]` - Pokazuje niewybranych zawodników",
+        "• `!kolejka add/remove [numery]` - Lista życzeń - bot wybiera z niej, gdy przyjdzie Twoja tura",
+        "• `!kolejka` - Pokazuje Twoją kolejkę",
         "• `!czas` - Pokazuje pozostały czas",
+        "• `!kolejnosc [liczba]` - Pokazuje najbliższe tury",
         "• `!pomoc` - Ta wiadomość",
-        "• `!lubicz` - Obrazek Lubicz",
-        "• `!komar` - Obrazek Komar",
-        "• `!reset` - Resetuje draft (admin)"
-        "• `!nazario` - Obrazek Nazario",
-        "• `!paei100` - Kto tam wie",
-        "• `!boniek` - Obrazek Boniek",
-        "• `!eusebio` - Obrazek Eusebio",
+        *(f"• `!{media.name}` - {media.description}" for media in media_commands.values()),
+        "• `!przypisz [@gracz] [drużyna]` - Dodaje gracza do draftu na tym kanale (admin)",
+        "• `!wypisz [@gracz lub nick]` - Usuwa gracza z draftu na tym kanale (admin)",
+        "• `!reset` - Resetuje draft (admin)",
+        "• `!przeladuj_media` - Wczytuje na nowo komendy z obrazkami (admin)",
+        "• `!aktualizuj_katalog [wymus]` - Przełącza trwający draft na najnowszą listę zawodników (admin)",
+        "ℹ️ `/wybieram`, `/wybieram_bonus`, `/lista` i `/czas` działają też jako komendy slash z podpowiedziami zawodników",
     ]
     await ctx.send("\n".join(help_msg))
 
@@ -594,4 +3144,8 @@ if __name__ == '__main__':
     TOKEN = os.getenv('DISCORD_TOKEN')
     if not TOKEN:
         raise ValueError("Brak tokenu Discord w zmiennych środowiskowych!")
-    bot.run(TOKEN)
+    try:
+        bot.run(TOKEN)
+    finally:
+        # Na wypadek wyjścia z pominięciem bot.close() (np. błąd logowania)
+        store.release_all(WORKER_ID)
@@ -0,0 +1,537 @@
+"""Symulacja pełnych draftów bez Discorda, sieci i czekania
+
+Wywołuje prawdziwe komendy bota (start, wybieram, bonus, wybieram_bonus, lista,
+czas) na sztucznych kanałach i członkach, a czas przesuwa FakeClock. Na końcu
+wypisuje percentyle opóźnień komend i zużycie pamięci.
+
+Użycie:
+    python simulate.py --drafts 1000
+    python simulate.py --stress 5000     # równoległe wybory w rundzie bonusowej - test atomowego
+                                         # commit_picks: bez duplikatów, każdy przyjęty wybór w dzienniku
+    python simulate.py --queues 0.5      # połowa graczy ma ustawioną !kolejka
+    python simulate.py --polls 0         # gracze patrzą na przypięty status zamiast pytać !czas
+    python simulate.py --windows         # równoległe okna wyboru zamiast pojedynczych tur
+    python simulate.py --stress 2000 --workers 4   # to samo z 4 procesów na wspólnej bazie SQLite,
+                                                   # plus wybory w głównym drafcie z każdego z nich
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import resource
+import sqlite3
+import sys
+import tempfile
+import time
+import tracemalloc
+from collections import defaultdict
+from datetime import datetime, timedelta
+
+os.environ.setdefault("DRAFT_DB_PATH", ":memory:")
+
+import discord
+
+import main
+
+
+# ========== SZTUCZNY DISCORD ========== #
+class FakeMember(discord.Object):
+    def __init__(self, id: int, name: str, guild=None, admin: bool = False):
+        super().__init__(id=id)
+        self.name = name
+        self.display_name = name
+        self.mention = f"<@{id}>"
+        self.guild = guild
+        self.guild_permissions = discord.Permissions(administrator=admin)
+
+    def __eq__(self, other):
+        return getattr(other, "id", None) == self.id
+
+    def __hash__(self):
+        return hash(self.id)
+
+
+class FakeGuild:
+    def __init__(self, id: int, members):
+        self.id = id
+        self.members = {m.id: m for m in members}
+        for m in members:
+            m.guild = self
+
+    def get_member(self, user_id: int):
+        return self.members.get(user_id)
+
+    async def fetch_member(self, user_id: int):
+        return self.members[user_id]
+
+    async def query_members(self, query: str, limit: int = 5):
+        query = query.lower()
+        return [m for m in self.members.values() if m.name.lower().startswith(query)][:limit]
+
+
+class FakeMessage:
+    def __init__(self, id: int, channel):
+        self.id = id
+        self.channel = channel
+
+    async def edit(self, content=None, **kwargs):
+        self.channel.edits += 1
+
+    async def pin(self):
+        pass
+
+
+class FakeChannel:
+    def __init__(self, id: int, guild: FakeGuild):
+        self.id = id
+        self.guild = guild
+        self.sent = 0
+        self.edits = 0
+        channels[id] = self
+
+    async def send(self, content=None, **kwargs):
+        self.sent += 1
+        return FakeMessage(self.id * 1_000_000 + self.sent, self)
+
+    def get_partial_message(self, message_id: int):
+        return FakeMessage(message_id, self)
+
+
+channels = {}  # kanały po id - dla bot.get_channel
+
+
+class FakeContext:
+    def __init__(self, author: FakeMember, channel: FakeChannel):
+        self.author = author
+        self.channel = channel
+        self.guild = channel.guild
+        self.message = None
+
+    async def send(self, content=None, **kwargs):
+        await self.channel.send(content)
+
+
+# ========== POMIARY ========== #
+latencies = defaultdict(list)
+draft_durations = []  # czas trwania draftu podstawowego na zegarze bota
+status_edits = []  # edycje przypiętego statusu na draft
+accepted_bonus = []  # [user_id, wybory] z każdego !wybieram_bonus, który przeszedł przez record()
+
+
+async def call(command, ctx, **kwargs):
+    start = time.perf_counter()
+    await command.callback(ctx, **kwargs)
+    latencies[command.name].append(time.perf_counter() - start)
+
+
+def percentile(values, fraction: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+
+def report(elapsed: float, drafts: int, messages: int):
+    print(
+        f"Drafty: {drafts} w {elapsed:.1f}s ({drafts / elapsed * 60:.0f}/min), wiadomości: {messages} "
+        f"(z {main.metrics.counters['draftbot_outbound_posts_total']:.0f} odpowiedzi bota)"
+    )
+    print(f"{'komenda':<16} {'liczba':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'max ms':>8}")
+    for name, values in sorted(latencies.items()):
+        print(
+            f"{name:<16} {len(values):>8} {percentile(values, 0.5) * 1000:>8.3f} "
+            f"{percentile(values, 0.95) * 1000:>8.3f} {percentile(values, 0.99) * 1000:>8.3f} "
+            f"{max(values) * 1000:>8.3f}"
+        )
+    if draft_durations:
+        hours = sorted(d.total_seconds() / 3600 for d in draft_durations)
+        print(
+            f"Draft podstawowy (czas bota): mediana {percentile(hours, 0.5):.1f} h, "
+            f"p95 {percentile(hours, 0.95):.1f} h, max {hours[-1]:.1f} h"
+        )
+    if status_edits:
+        print(f"Edycje statusu: {sum(status_edits)} (średnio {sum(status_edits) / len(status_edits):.1f} na draft)")
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    if tracemalloc.is_tracing():
+        current, peak = tracemalloc.get_traced_memory()
+        print(f"Pamięć Pythona: {current / 2**20:.1f} MiB (szczyt {peak / 2**20:.1f} MiB), max RSS {rss:.1f} MiB")
+    else:
+        print(f"Max RSS: {rss:.1f} MiB (dokładniej: --tracemalloc)")
+
+
+# ========== SCENARIUSZE ========== #
+def setup_catalogue(size: int):
+    main.players_database = main.Catalogue.from_pairs([(i, f"Zawodnik {i}") for i in range(1, size + 1)])
+    main.player_index = main.PlayerIndex(main.players_database)
+    main.catalogue_ready.set()
+    main.scheduler.clock = main.FakeClock()
+    main.COALESCE_WINDOW = 0
+    main.bot.get_channel = channels.get
+
+
+BONUS_MEMBERS = 300  # uczestników draftu z rundą dodatkową w --stress - każdy może wybrać raz
+COMMIT_DELAY = 0.002  # sekundy - wstrzymanie między walidacją wyboru a zapisem w dzienniku (--workers)
+
+
+def make_channel(draft_no: int, extra: int = 0):
+    """Kanał z graczami z DEFAULT_USER_TEAMS i `extra` dodatkowymi członkami serwera"""
+    members = [FakeMember(draft_no * 10_000 + i, name) for i, name in enumerate(main.DEFAULT_USER_TEAMS)]
+    members += [FakeMember(draft_no * 10_000 + len(members) + i, f"gracz{i}") for i in range(extra)]
+    guild = FakeGuild(draft_no, members)
+    return FakeChannel(draft_no, guild), members
+
+
+async def enroll(channel, members):
+    """Zapisuje członków do draftu na kanale - jak !przypisz, ale bez limitu drużyn z TEAM_COLORS"""
+    draft = main.get_draft(FakeContext(members[0], channel))
+    async with main.locked(draft):
+        main.record(draft, "teams", user_teams={
+            m.name: main.DEFAULT_USER_TEAMS.get(m.name, f"Drużyna {m.name}") for m in members
+        })
+        main.record(draft, "bind", participant_ids={m.name: m.id for m in members})
+
+
+def track_bonus_picks():
+    """Zbiera wybory bonusowe zapisane przez record() - do porównania z dziennikiem na końcu"""
+    real_record = main.record
+
+    def tracking_record(state, kind, **data):
+        real_record(state, kind, **data)
+        if kind == "bonus_pick":
+            accepted_bonus.append([data["user_id"], data["picks"]])
+    main.record = tracking_record
+
+
+def delay_commits():
+    """Wstrzymuje zapis wyboru już po walidacji - inne workery mają wtedy realną szansę wejść pomiędzy"""
+    real_append = main.store.append
+
+    def delayed_append(key, kind, *args):
+        if kind == "bonus_pick":
+            time.sleep(COMMIT_DELAY)
+        return real_append(key, kind, *args)
+    main.store.append = delayed_append
+
+
+def available_picks(draft, count: int, rnd: random.Random):
+    picks = set()
+    while len(picks) < count:
+        p = rnd.randint(1, len(draft.players_database))
+        if p not in draft.picked_numbers:
+            picks.add(p)
+    return sorted(picks)
+
+
+async def simulate_draft(draft_no: int, rnd: random.Random, timeout_rate: float, queue_rate: float, poll_rate: float):
+    channel, members = make_channel(draft_no)
+    assert not main.get_draft(FakeContext(members[0], channel)).participants, "nowy kanał z cudzymi graczami!"
+    await enroll(channel, members)
+    ctx = FakeContext(members[0], channel)
+    for member in members:
+        if rnd.random() < queue_rate:
+            wishlist = rnd.sample(range(1, len(main.players_database) + 1), main.QUEUE_LIMIT)
+            await call(main.kolejka_add, FakeContext(member, channel), choice=", ".join(map(str, wishlist)))
+    started_at = main.now()
+    await call(main.start, ctx)
+    draft = main.get_draft(ctx)
+
+    while draft.draft_started and draft.pick_mode == "windows":
+        await simulate_window(draft, channel, members, rnd, timeout_rate)
+
+    while draft.draft_started:
+        player = draft.on_the_clock
+        if rnd.random() < timeout_rate:
+            await main.scheduler.advance(main.SELECTION_TIME)
+            continue
+        if rnd.random() < poll_rate:
+            await call(main.czas, FakeContext(rnd.choice(members), channel))
+        if rnd.random() < 0.1:
+            await call(main.lista, FakeContext(rnd.choice(members), channel))
+        expected = draft.current_turn.picks
+        picks = available_picks(draft, expected, rnd)
+        await main.scheduler.advance(timedelta(minutes=rnd.randint(1, 600)))
+        await call(main.wybieram, FakeContext(player, channel), choice=", ".join(map(str, picks)))
+    draft_durations.append(main.now() - started_at)
+
+    bonus_members = [m for m in members if rnd.random() < 0.5]
+    for member in bonus_members:
+        await call(main.bonus, FakeContext(member, channel))
+    await main.scheduler.advance(main.BONUS_SIGNUP_TIME + timedelta(seconds=1))
+    for member in bonus_members:
+        picks = available_picks(draft, main.BONUS_PICKS, rnd)
+        await call(main.wybieram_bonus, FakeContext(member, channel), choice=", ".join(map(str, picks)))
+    await call(main.lista, ctx)
+    await main.scheduler.advance(main.BONUS_SELECTION_TIME)
+    await main.flush_outboxes()
+    status_edits.append(channel.edits)
+    return channel.sent
+
+
+async def simulate_window(draft, channel, members, rnd: random.Random, timeout_rate: float):
+    """Jedna runda w trybie okien - gracze zgłaszają listy w losowej kolejności i w losowych chwilach"""
+    pick_no = draft.pick_no
+    turns = draft.window_turns()
+    # Wszyscy celują w tych samych najlepszych zawodników, żeby były konflikty do rozstrzygnięcia
+    pool = [p for p in range(1, len(draft.players_database) + 1) if p not in draft.picked_numbers][:60]
+    for turn in rnd.sample(turns, len(turns)):
+        if rnd.random() < timeout_rate:
+            continue
+        await main.scheduler.advance(timedelta(minutes=rnd.randint(1, 120)))
+        if draft.pick_no != pick_no:
+            return
+        wishlist = rnd.sample(pool, turn.picks + 5)
+        player = draft.players[turn.player_index]
+        await call(main.wybieram, FakeContext(player, channel), choice=", ".join(map(str, wishlist)))
+    if draft.pick_no == pick_no:
+        await main.scheduler.advance(main.SELECTION_TIME)
+
+
+async def run_drafts(count: int, seed: int, timeout_rate: float, queue_rate: float, poll_rate: float):
+    rnd = random.Random(seed)
+    messages = 0
+    start = time.perf_counter()
+    for draft_no in range(1, count + 1):
+        messages += await simulate_draft(draft_no, rnd, timeout_rate, queue_rate, poll_rate)
+    report(time.perf_counter() - start, count, messages)
+
+
+async def prepare_bonus_round():
+    """Draft setek graczy, w którym wszyscy przegapili tury i zapisali się do rundy dodatkowej"""
+    channel, members = make_channel(1, BONUS_MEMBERS)
+    await enroll(channel, members)
+    ctx = FakeContext(members[0], channel)
+    round_picks, main.DRAFT_ROUND_PICKS = main.DRAFT_ROUND_PICKS, [1]  # jedna runda - i tak same timeouty
+    try:
+        await call(main.start, ctx)
+    finally:
+        main.DRAFT_ROUND_PICKS = round_picks
+    draft = main.get_draft(ctx)
+    await main.scheduler.advance(main.SELECTION_TIME * len(draft.schedule))
+    for member in members:
+        await call(main.bonus, FakeContext(member, channel))
+    await main.scheduler.advance(main.BONUS_SIGNUP_TIME + timedelta(seconds=1))
+    return draft, channel, members
+
+
+async def bonus_storm(channel, members, picks: int, rnd: random.Random):
+    async def yielding_send(content=None, **kwargs):
+        await asyncio.sleep(0)  # każda odpowiedź oddaje sterowanie innym komendom
+        channel.sent += 1
+        return FakeMessage(channel.id * 1_000_000 + channel.sent, channel)
+    channel.send = yielding_send
+
+    # Pula tylko 2x większa niż suma wyborów - wiele zgłoszeń zderza się z cudzymi i musi zostać odrzucona
+    pool = range(1, len(members) * main.BONUS_PICKS * 2)
+    await asyncio.gather(*(
+        call(
+            main.wybieram_bonus,
+            FakeContext(rnd.choice(members), channel),
+            choice=", ".join(map(str, rnd.sample(pool, main.BONUS_PICKS)))
+        )
+        for _ in range(picks)
+    ))
+
+
+def check_no_duplicates(draft, picks: int, accepted):
+    assigned = [p for user_picks in draft.picked_players.values() for p in user_picks]
+    assert len(assigned) == len(set(assigned)) == len(draft.picked_numbers), "zawodnik przypisany dwa razy!"
+    assert all(len(p) <= main.BONUS_PICKS for p in draft.picked_players.values()), "podwójny wybór bonusowy!"
+    # Każdy przyjęty wybór jest w dzienniku (stan wczytany od nowa), i nic ponad nie
+    nicks = {str(user_id): nick for nick, user_id in draft.participant_ids.items()}
+    journaled = sorted((str(user_id), sorted(picks)) for user_id, picks in accepted)
+    stored = sorted(
+        (user_id, sorted(draft.picked_players[nick])) for user_id, nick in nicks.items() if draft.picked_players.get(nick)
+    )
+    assert journaled == stored, "przyjęty wybór nie trafił do dziennika albo dziennik ma nieprzyjęty!"
+    assert len({user_id for user_id, _ in accepted}) == len(accepted), "gracz wybrał w rundzie dodatkowej dwa razy!"
+    print(
+        f"OK: {picks} równoległych wyborów, {len(accepted)} przyjętych i zapisanych w dzienniku, "
+        f"{len(assigned)} przypisanych zawodników bez duplikatów"
+    )
+
+
+def check_main_draft(draft):
+    assigned = [p for user_picks in draft.picked_players.values() for p in user_picks]
+    expected = sum(turn.picks for turn in draft.schedule)
+    assert not draft.draft_started, "główny draft nie dobiegł końca!"
+    assert len(assigned) == len(set(assigned)) == expected, "zły stan głównego draftu!"
+    print(f"OK: główny draft dokończony z kilku workerów, {len(assigned)} zawodników bez duplikatów")
+
+
+async def pick_race(channel, members, rnd: random.Random):
+    """Wybory w głównym drafcie z workera, który zwykle nie ma timerów - gracze są tu discord.Object"""
+    draft = main.get_draft(FakeContext(members[0], channel))
+    by_id = {m.id: m for m in members}
+    while True:
+        main.load_draft(draft.key)
+        if not draft.draft_started:
+            break
+        player = by_id[draft.on_the_clock.id]
+        picks = available_picks(draft, draft.current_turn.picks, rnd)
+        if rnd.random() < 0.3:
+            # Ktoś próbuje poza swoją turą
+            other = rnd.choice([m for m in members if m != player])
+            await call(main.wybieram, FakeContext(other, channel), choice="1")
+        await call(main.wybieram, FakeContext(player, channel), choice=", ".join(map(str, picks)))
+        await asyncio.sleep(0.001)  # inne workery też mają szansę wybrać
+
+
+async def check_busy_journal(path: str):
+    """Inny worker trzyma blokadę zapisu: przy snapshocie po wyborze i przy otwieraniu następnej tury"""
+    channel, members = make_channel(3)
+    await enroll(channel, members)
+    await call(main.start, FakeContext(members[0], channel))
+    draft = main.get_draft(FakeContext(members[0], channel))
+    blocker = sqlite3.connect(path, isolation_level=None)
+    real_snapshot, real_append = main.store.snapshot, main.store.append
+
+    def blocked_snapshot(*args):
+        blocker.execute("BEGIN IMMEDIATE")
+        try:
+            return real_snapshot(*args)
+        finally:
+            blocker.execute("ROLLBACK")
+
+    # Snapshot nie może zepsuć wyboru, który jest już w dzienniku
+    main.store.snapshot = blocked_snapshot
+    main.store.pending[draft.key] = main.SNAPSHOT_EVERY
+    pick_no, player = draft.pick_no, draft.on_the_clock
+    await call(main.wybieram, FakeContext(player, channel), choice=", ".join(
+        map(str, available_picks(draft, draft.current_turn.picks, random.Random(3)))
+    ))
+    main.store.snapshot = real_snapshot
+    assert draft.pick_no == pick_no + 1 and draft.pick_deadline, "zajęta baza przy snapshocie zatrzymała draft!"
+    assert main.store.pending[draft.key] > main.SNAPSHOT_EVERY, "nieudany snapshot nie czeka na ponowienie!"
+    main.store.release_all(main.WORKER_ID)
+    main.load_draft(draft.key)
+    assert main.take_timer_lease(draft) and draft.timers, "tura bez timera!"
+
+    # Wybór zapisany, zdarzenie "turn" odrzucone - sync_drafts musi otworzyć turę
+    def append_then_block(key, kind, *args):
+        seq = real_append(key, kind, *args)
+        if kind == "pick":
+            # Blokada trwa dłużej niż busy timeout, ale puszcza, zanim komenda odda dzierżawę
+            blocker.execute("BEGIN IMMEDIATE")
+            asyncio.get_running_loop().call_later(0.2, blocker.execute, "ROLLBACK")
+        return seq
+    main.store.append = append_then_block
+    player = draft.on_the_clock
+    try:
+        await call(main.wybieram, FakeContext(player, channel), choice=", ".join(
+            map(str, available_picks(draft, draft.current_turn.picks, random.Random(4)))
+        ))
+        raise AssertionError("zdarzenie turn przeszło mimo blokady")
+    except sqlite3.OperationalError:
+        pass
+    finally:
+        main.store.append = real_append
+    assert not draft.pick_deadline and draft.armed_seq < draft.seq
+    main.bot.get_guild = {channel.guild.id: channel.guild}.get
+    await main.sync_drafts()
+    assert draft.pick_deadline and draft.armed_seq == draft.seq, "sync_drafts nie otworzył tury!"
+    main.store.release_all(main.WORKER_ID)
+    print("OK: zajęta baza przy snapshocie nie psuje wyboru, a przerwaną turę otwiera sync_drafts")
+
+
+async def run_stress(picks: int, seed: int):
+    """Tysiące przeplatanych !wybieram_bonus - żaden zawodnik nie może trafić do dwóch graczy"""
+    draft, channel, members = await prepare_bonus_round()
+    track_bonus_picks()
+    start = time.perf_counter()
+    await bonus_storm(channel, members, picks, random.Random(seed))
+    main.drafts.clear()
+    check_no_duplicates(main.load_draft(draft.key), picks, accepted_bonus)
+    report(time.perf_counter() - start, 1, channel.sent)
+
+
+async def run_workers(workers: int, picks: int, seed: int, catalogue: int):
+    """To samo co --stress, ale z kilku procesów na wspólnej bazie - jak kilka workerów bota"""
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "draft.db")
+        main.store = main.DraftStore(path)
+        await check_busy_journal(path)
+        draft, channel, members = await prepare_bonus_round()
+        main_channel, main_members = make_channel(2)
+        await enroll(main_channel, main_members)
+        await call(main.start, FakeContext(main_members[0], main_channel))
+        await main.flush_outboxes()
+        main.store.release_all(main.WORKER_ID)  # ten proces schodzi ze sceny jak worker przy wdrożeniu
+
+        lease_ttl = 1.0
+        start = time.perf_counter()
+        processes = [
+            await asyncio.create_subprocess_exec(
+                sys.executable, __file__, "--worker", "--stress", str(picks // workers),
+                "--seed", str(seed + i), "--catalogue", str(catalogue), "--clock", main.now().isoformat(),
+                env={**os.environ, "DRAFT_DB_PATH": path, "WORKER_ID": f"worker-{i}", "LEASE_TTL": str(lease_ttl)},
+                stdout=asyncio.subprocess.PIPE
+            )
+            for i in range(workers)
+        ]
+        results = [json.loads((await p.communicate())[0]) for p in processes]
+        elapsed = time.perf_counter() - start
+
+        main.drafts.clear()
+        accepted = [pick for r in results for pick in r["accepted"]]
+        check_no_duplicates(main.load_draft(draft.key), picks, accepted)
+        check_main_draft(main.load_draft(f"2:{main_channel.id}"))
+        owners = [r["worker"] for r in results if r["owns_timers"]]
+        assert len(owners) == 1, f"timery draftu u {len(owners)} workerów!"
+        print(f"Timery draftu ma dokładnie jeden worker: {owners[0]}")
+
+        lease = f"timers:{draft.key}"
+        assert not main.store.try_lease(lease, "zapasowy", lease_ttl), "dzierżawa przejęta przed wygaśnięciem!"
+        await asyncio.sleep(lease_ttl + 0.1)
+        assert main.store.try_lease(lease, "zapasowy", lease_ttl), "dzierżawa nie wygasła!"
+        print(f"Po wygaśnięciu dzierżawy ({lease_ttl:.0f}s) timery przejmuje inny worker")
+        print(f"Workery: {workers}, czas {elapsed:.1f}s, wiadomości: {sum(r['sent'] for r in results)}")
+
+
+async def run_worker(picks: int, seed: int, clock: str):
+    main.scheduler.clock.now = datetime.fromisoformat(clock)
+    channel, members = make_channel(1, BONUS_MEMBERS)
+    draft = main.get_draft(FakeContext(members[0], channel))
+    owns_timers = main.take_timer_lease(draft)
+    track_bonus_picks()
+    delay_commits()
+    await bonus_storm(channel, members, picks, random.Random(seed))
+    main_channel, main_members = make_channel(2)
+    await pick_race(main_channel, main_members, random.Random(seed))
+    await main.flush_outboxes()
+    print(json.dumps({
+        "worker": main.WORKER_ID, "owns_timers": owns_timers, "sent": channel.sent, "accepted": accepted_bonus
+    }))
+
+
+def main_cli():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--drafts", type=int, default=200, help="liczba pełnych draftów do odegrania")
+    parser.add_argument("--catalogue", type=int, default=5000, help="liczba zawodników w katalogu")
+    parser.add_argument("--timeouts", type=float, default=0.1, help="odsetek tur kończonych timeoutem")
+    parser.add_argument("--queues", type=float, default=0.0, help="odsetek graczy z ustawioną !kolejka")
+    parser.add_argument("--polls", type=float, default=0.2, help="odsetek tur, w których ktoś sprawdza !czas")
+    parser.add_argument("--windows", action="store_true", help="tryb równoległych okien wyboru")
+    parser.add_argument("--stress", type=int, default=0, help="zamiast draftów: tyle równoległych wyborów bonusowych")
+    parser.add_argument("--workers", type=int, default=0, help="z --stress: tyle procesów na wspólnej bazie SQLite")
+    parser.add_argument("--worker", action="store_true", help=argparse.SUPPRESS)
+    parser.add_argument("--clock", help=argparse.SUPPRESS)
+    parser.add_argument("--tracemalloc", action="store_true", help="mierz pamięć Pythona (spowalnia ok. 2x)")
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    if args.tracemalloc:
+        tracemalloc.start()
+    setup_catalogue(args.catalogue)
+    if args.windows:
+        main.DRAFT_PICK_MODE = "windows"
+    if args.worker:
+        asyncio.run(run_worker(args.stress, args.seed, args.clock))
+    elif args.stress and args.workers:
+        asyncio.run(run_workers(args.workers, args.stress, args.seed, args.catalogue))
+    elif args.stress:
+        asyncio.run(run_stress(args.stress, args.seed))
+    else:
+        asyncio.run(run_drafts(args.drafts, args.seed, args.timeouts, args.queues, args.polls))
+
+
+if __name__ == "__main__":
+    main_cli()